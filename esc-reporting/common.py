@@ -8,11 +8,53 @@
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 #
 
+import os
+import json
+import datetime
+import hashlib
+import gc
+import pickle
+import threading
+import time
+import sqlite3
+import sys
+import cProfile
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlparse
 from subprocess import Popen, PIPE
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 
+# resource is not there on all platforms, the profile then has no rss
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# one keep-alive session shared by all threads, see util_http_setup()
+httpSession = None
+httpCfg = {'retries': 5,
+           'backoff': 2,
+           'pool': 16,
+           'connect-timeout': 15,
+           'timeout': 300,
+           'rate': {},
+           'cache-dir': None,
+           'cache-size': 256 * 1024 * 1024,
+           'cache-ttl': {}}
+httpLock = threading.Lock()
+httpNextCall = {}
+httpCacheLock = threading.Lock()
+
+# the run of util_profile_start(), stages of a thread are nested in profileLocal.stack
+profileRun = None
+profileLock = threading.Lock()
+profileLocal = threading.local()
+
 def sendMail(cfg, mail, subject, content, attachFile=None):
     msg = MIMEMultipart()
     msg["From"] = "mentoring@documentfoundation.org"
@@ -41,3 +83,631 @@ def util_errorMail(cfg, fileName, text):
     subject = "ERROR: " + fileName + " FAILED"
     message = text + '\nPlease have a look at vm174'
     sendMail(cfg, 'mentoring@documentfoundation.org', subject, message)
+
+
+
+def util_http_setup(cfg):
+    global httpSession
+
+    # cfg['http'] can override any of the defaults in httpCfg, 'rate' maps a host
+    # to the minimum number of seconds between two requests to it
+    if 'http' in cfg:
+      httpCfg.update(cfg['http'])
+    if httpCfg['cache-dir'] is None and 'homedir' in cfg:
+      httpCfg['cache-dir'] = cfg['homedir'] + 'dump/http-cache/'
+
+    # transient errors are retried with exponential backoff (backoff * 2^n seconds),
+    # POST is not retried since it is not idempotent
+    retry = Retry(total=httpCfg['retries'],
+                  backoff_factor=httpCfg['backoff'],
+                  status_forcelist=[429, 500, 502, 503, 504],
+                  respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=httpCfg['pool'], pool_maxsize=httpCfg['pool'], max_retries=retry)
+    httpSession = requests.Session()
+    httpSession.mount('https://', adapter)
+    httpSession.mount('http://', adapter)
+    return httpSession
+
+
+
+def util_http_wait(url):
+    host = urlparse(url).netloc
+    if not host in httpCfg['rate']:
+      return
+    with httpLock:
+      now = time.monotonic()
+      slot = max(now, httpNextCall.get(host, now))
+      httpNextCall[host] = slot + httpCfg['rate'][host]
+    if slot > now:
+      time.sleep(slot - now)
+
+
+
+def util_http_request(method, url, **kwargs):
+    if httpSession is None:
+      util_http_setup({})
+    util_http_wait(url)
+    if not 'timeout' in kwargs:
+      kwargs['timeout'] = (httpCfg['connect-timeout'], httpCfg['timeout'])
+    return httpSession.request(method, url, **kwargs)
+
+
+
+# On-disk cache for GET requests in httpCfg['cache-dir'], one <sha1 of url>.json per url
+# holding the validators (ETag/Last-Modified) and the body. A cached entry younger than
+# the ttl of the url is used without asking the server, otherwise it is revalidated with
+# If-None-Match/If-Modified-Since, so an unchanged resource only costs a 304.
+# httpCfg['cache-ttl'] maps url prefixes to seconds (longest prefix wins, default 0).
+# The file mtime is the last use, the least recently used files are removed once the
+# cache is larger than httpCfg['cache-size'] bytes.
+def util_http_cache_ttl(url):
+    ttl = 0
+    match = ''
+    for prefix, seconds in httpCfg['cache-ttl'].items():
+      if url.startswith(prefix) and len(prefix) > len(match):
+        match = prefix
+        ttl = seconds
+    return ttl
+
+
+
+def util_http_cache_evict():
+    cacheDir = httpCfg['cache-dir']
+    with httpCacheLock:
+      entries = []
+      for x in os.listdir(cacheDir):
+        if x.endswith('.json'):
+          st = os.stat(cacheDir + x)
+          entries.append((st.st_mtime, st.st_size, cacheDir + x))
+      total = sum(x[1] for x in entries)
+      for mtime, size, name in sorted(entries):
+        if total <= httpCfg['cache-size']:
+          break
+        os.remove(name)
+        total -= size
+
+
+
+def util_http_cached(url, **kwargs):
+    if httpCfg['cache-dir'] is None:
+      r = util_http_request('GET', url, **kwargs)
+      r.raise_for_status()
+      return r.text
+
+    os.makedirs(httpCfg['cache-dir'], exist_ok=True)
+    fileName = httpCfg['cache-dir'] + hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json'
+    entry = None
+    try:
+      with open(fileName, encoding='utf-8') as fp:
+        entry = json.load(fp)
+    except (OSError, ValueError):
+      pass
+
+    headers = kwargs.pop('headers', {})
+    if entry is not None:
+      if time.time() - entry['stored'] < util_http_cache_ttl(url):
+        os.utime(fileName)
+        return entry['body']
+      if entry['etag']:
+        headers['If-None-Match'] = entry['etag']
+      if entry['last-modified']:
+        headers['If-Modified-Since'] = entry['last-modified']
+
+    r = util_http_request('GET', url, headers=headers, **kwargs)
+    if r.status_code == 304 and entry is not None:
+      r.close()
+    else:
+      r.raise_for_status()
+      entry = {'url': url,
+               'etag': r.headers.get('ETag'),
+               'last-modified': r.headers.get('Last-Modified'),
+               'body': r.text}
+      r.close()
+    entry['stored'] = time.time()
+
+    tmpName = fileName + '.' + str(threading.get_ident()) + '.tmp'
+    with open(tmpName, 'w', encoding='utf-8') as fp:
+      json.dump(entry, fp, ensure_ascii=False)
+    os.replace(tmpName, fileName)
+    util_http_cache_evict()
+    return entry['body']
+
+
+
+# Large dumps (bugzilla) are stored as a base file plus append-only segments
+# in <fileName>.segments/NNNNNN.jsonl. Each line of a segment is a partial dump,
+# dict values are merged into the base one level deep (e.g. {"bugs": {id: bug}}),
+# other values (e.g. newest-entry) replace the base value.
+def util_segment_list(fileName):
+    segDir = fileName + '.segments/'
+    if not os.path.isdir(segDir):
+      return []
+    return sorted(segDir + x for x in os.listdir(segDir) if x.endswith('.jsonl'))
+
+
+
+def util_load_dump(fileName):
+    try:
+      rawData = None
+      if os.path.isfile(fileName):
+        with open(fileName, encoding='utf-8') as fp:
+          rawData = json.load(fp)
+      for segment in util_segment_list(fileName):
+        if rawData is None:
+          rawData = {}
+        with open(segment, encoding='utf-8') as fp:
+          for line in fp:
+            for key, value in json.loads(line).items():
+              if type(value) is dict and type(rawData.get(key)) is dict:
+                rawData[key].update(value)
+              else:
+                rawData[key] = value
+      if rawData is None:
+        raise Exception('file not found')
+    except Exception as e:
+      print('Error load file ' + fileName + ' due to ' + str(e))
+      rawData = None
+    return rawData
+
+
+
+# Parsing the big dumps takes long, so the parsed data is kept as pickle in
+# <fileName>.snapshot, tagged with name, mtime and size of the dump and its
+# segments. qa/common.py reads and writes the same snapshots.
+# Bugzilla dumps are stored with decoded timestamps, see util_decode_bugs() and
+# util_compact_bugs(), and the duplicates index of util_index_duplicates().
+snapshotVersion = 3
+
+def util_parse_bz_date(x):
+    # bugzilla always uses "%Y-%m-%dT%H:%M:%SZ", fromisoformat is a lot faster than strptime
+    return datetime.datetime.fromisoformat(x[:19])
+
+
+
+def util_decode_bugs(rawData):
+    # adds a datetime next to every timestamp the analysis uses:
+    # bug creation_date/last_change_date, comment creation_date, history when_date
+    for row in rawData['bugs'].values():
+      row['creation_date'] = util_parse_bz_date(row['creation_time'])
+      row['last_change_date'] = util_parse_bz_date(row['last_change_time'])
+      for comment in row.get('comments', []):
+        comment['creation_date'] = util_parse_bz_date(comment['creation_time'])
+      for change in row.get('history', []):
+        change['when_date'] = util_parse_bz_date(change['when'])
+
+
+
+def util_index_duplicates(rawData):
+    # maps every duplicate to what util_check_duplicated() in qa/common.py returns, the end of
+    # its dupe_of chain inside the dump. Every chain is walked once, all the bugs on it
+    # get the same end. A cycle ends at the bug where it closes.
+    bugs = rawData['bugs']
+    roots = {}
+    for key, row in bugs.items():
+      if not row.get('dupe_of') or key in roots:
+        continue
+      path = []
+      seen = set()
+      x = key
+      while True:
+        if x in roots:
+          root = roots[x]
+          break
+        dupeOf = bugs[x].get('dupe_of')
+        if not dupeOf or x in seen:
+          root = bugs[x]['id']
+          break
+        path.append(x)
+        seen.add(x)
+        if str(dupeOf) not in bugs:
+          root = bugs[x]['id']
+          break
+        x = str(dupeOf)
+      for x in path:
+        roots[x] = root
+    rawData['dupeRoots'] = roots
+
+
+
+# util_load_snapshot(fileName, compact=True) keeps comments, history entries and
+# their changes as records (tuples) instead of dicts, and shares the strings that
+# repeat all over the dump (status, component, mail addresses, field names, ...).
+# A record is read like the dict it replaces: comment['creator'], change.get('added'),
+# fields not in its list (like 'bug_id' and 'time' of a comment) are dropped.
+class BugzillaRecord(tuple):
+    __slots__ = ()
+    fields = ()
+    index = {}
+
+    def __getitem__(self, key):
+      if type(key) is str:
+        try:
+          key = self.index[key]
+        except KeyError:
+          raise KeyError(key) from None
+      return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+      i = self.index.get(key)
+      return default if i is None else tuple.__getitem__(self, i)
+
+    def __contains__(self, key):
+      return key in self.index
+
+    def keys(self):
+      return self.fields
+
+    def items(self):
+      return zip(self.fields, self)
+
+    def __repr__(self):
+      return repr(dict(self.items()))
+
+
+
+class BugzillaComment(BugzillaRecord):
+    __slots__ = ()
+    fields = ('id', 'count', 'creator', 'creation_time', 'creation_date', 'text', 'tags', 'is_private', 'attachment_id')
+    index = {x: i for i, x in enumerate(fields)}
+
+
+
+class BugzillaHistory(BugzillaRecord):
+    __slots__ = ()
+    fields = ('who', 'when', 'when_date', 'changes')
+    index = {x: i for i, x in enumerate(fields)}
+
+
+
+class BugzillaChange(BugzillaRecord):
+    __slots__ = ()
+    fields = ('field_name', 'added', 'removed', 'attachment_id')
+    index = {x: i for i, x in enumerate(fields)}
+
+
+
+# values of the bugs that are shared between them, details are the *_detail dicts
+compactBugFields = ['status', 'resolution', 'component', 'product', 'classification', 'op_sys', 'platform',
+                    'version', 'priority', 'severity', 'target_milestone', 'whiteboard', 'creator',
+                    'assigned_to', 'qa_contact']
+compactBugLists = ['keywords', 'cc']
+compactBugDetails = ['creator_detail', 'assigned_to_detail', 'qa_contact_detail']
+
+
+
+def util_compact_detail(shared, detail):
+    key = (detail.get('email'), detail.get('name'), detail.get('real_name'))
+    if key not in shared:
+      shared[key] = {x: shared.setdefault(y, y) if type(y) is str else y for x, y in detail.items()}
+    return shared[key]
+
+
+
+def util_compact_date(dates, x):
+    # returns the timestamp and its datetime, comments and changes of one action have the same
+    if x not in dates:
+      dates[x] = (x, util_parse_bz_date(x))
+    return dates[x]
+
+
+
+def util_compact_bugs(rawData):
+    # util_decode_bugs() with records, see BugzillaRecord
+    shared = {}
+    dates = {}
+    for row in rawData['bugs'].values():
+      row['creation_date'] = util_parse_bz_date(row['creation_time'])
+      row['last_change_date'] = util_parse_bz_date(row['last_change_time'])
+      for x in compactBugFields:
+        if type(row.get(x)) is str:
+          row[x] = shared.setdefault(row[x], row[x])
+      for x in compactBugLists:
+        if x in row:
+          row[x] = [shared.setdefault(y, y) for y in row[x]]
+      for x in compactBugDetails:
+        if type(row.get(x)) is dict:
+          row[x] = util_compact_detail(shared, row[x])
+      if 'cc_detail' in row:
+        row['cc_detail'] = [util_compact_detail(shared, x) for x in row['cc_detail']]
+
+      comments = []
+      for x in row.get('comments', []):
+        when = util_compact_date(dates, x['creation_time'])
+        comments.append(BugzillaComment((x.get('id'), x.get('count'), shared.setdefault(x['creator'], x['creator']),
+                                         when[0], when[1], x.get('text'), tuple(shared.setdefault(y, y) for y in x.get('tags', [])),
+                                         x.get('is_private'), x.get('attachment_id'))))
+      if 'comments' in row:
+        row['comments'] = comments
+
+      history = []
+      for x in row.get('history', []):
+        when = util_compact_date(dates, x['when'])
+        changes = tuple(BugzillaChange((shared.setdefault(y['field_name'], y['field_name']), shared.setdefault(y['added'], y['added']),
+                                        shared.setdefault(y['removed'], y['removed']), y.get('attachment_id')))
+                        for y in x['changes'])
+        history.append(BugzillaHistory((shared.setdefault(x['who'], x['who']), when[0], when[1], changes)))
+      if 'history' in row:
+        row['history'] = history
+
+
+
+def util_snapshot_key(fileName):
+    key = [snapshotVersion]
+    for x in [fileName] + util_segment_list(fileName):
+      if os.path.isfile(x):
+        st = os.stat(x)
+        key.append([os.path.basename(x), st.st_mtime_ns, st.st_size])
+    return key
+
+
+
+def util_load_snapshot(fileName, compact=False):
+    key = util_snapshot_key(fileName)
+    # compact data has its own snapshot, the scripts may load the same dump either way
+    snapshotName = fileName + ('.compact.snapshot' if compact else '.snapshot')
+    # the data is a tree without cycles, the cyclic gc only slows down loading it
+    gcEnabled = gc.isenabled()
+    gc.disable()
+    try:
+      try:
+        with open(snapshotName, 'rb') as fp:
+          if pickle.load(fp) == key:
+            return pickle.load(fp)
+      except Exception:
+        pass
+
+      # missing or outdated, parse the dump and store a new snapshot
+      rawData = util_load_dump(fileName)
+      if rawData is not None and type(rawData.get('bugs')) is dict:
+        if compact:
+          util_compact_bugs(rawData)
+        else:
+          util_decode_bugs(rawData)
+        util_index_duplicates(rawData)
+      if rawData is not None:
+        tmpName = snapshotName + '.' + str(os.getpid())
+        try:
+          with open(tmpName, 'wb') as fp:
+            pickle.dump(key, fp, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(rawData, fp, pickle.HIGHEST_PROTOCOL)
+          os.replace(tmpName, snapshotName)
+        except Exception as e:
+          print('Error dump file ' + snapshotName + ' due to ' + str(e))
+          if os.path.isfile(tmpName):
+            os.remove(tmpName)
+      return rawData
+    finally:
+      if gcEnabled:
+        gc.enable()
+
+
+
+def util_dump_segment(fileName, rawList, key, idList):
+    segList = util_segment_list(fileName)
+    if segList:
+      segNo = int(os.path.basename(segList[-1])[:-6]) + 1
+    else:
+      segNo = 1
+      os.makedirs(fileName + '.segments', exist_ok=True)
+    segName = fileName + '.segments/' + str(segNo).zfill(6) + '.jsonl'
+
+    # the segment only becomes visible to loaders once it is complete
+    with open(segName + '.tmp', 'w', encoding='utf-8') as fp:
+      for id in idList:
+        print(json.dumps({key: {id: rawList[key][id]}}, ensure_ascii=False), file=fp)
+      print(json.dumps({i: x for i, x in rawList.items() if type(x) is not dict}, ensure_ascii=False), file=fp)
+    os.replace(segName + '.tmp', segName)
+    return len(segList) + 1
+
+
+
+def util_remove_segments(fileName):
+    for segment in util_segment_list(fileName):
+      os.remove(segment)
+
+
+
+# Write-ahead journal of a collector run (<dump>.journal), one JSON entry per line.
+# Entries are appended and synced before the data is used, so a new run can
+# replay them and resume where a killed run stopped. The journal is removed
+# once the dump is written.
+def util_journal_load(fileName):
+    entries = []
+    if not os.path.isfile(fileName):
+      return entries
+    with open(fileName, 'r+b') as fp:
+      pos = 0
+      for line in fp:
+        try:
+          if not line.endswith(b'\n'):
+            raise ValueError('incomplete line')
+          entries.append(json.loads(line.decode('utf-8')))
+        except ValueError:
+          # last entry was only partly written, drop it
+          fp.truncate(pos)
+          break
+        pos += len(line)
+    return entries
+
+
+
+def util_journal_append(fileName, entry):
+    with open(fileName, 'a', encoding='utf-8') as fp:
+      print(json.dumps(entry, ensure_ascii=False), file=fp)
+      fp.flush()
+      os.fsync(fp.fileno())
+
+
+
+def util_journal_remove(fileName):
+    if os.path.isfile(fileName):
+      os.remove(fileName)
+
+
+
+# The counters of the stats.json snapshots (statList['data']) are also kept in
+# <homedir>stats.sqlite, one row per snapshot name ('stats_YYYY-MM-DD' for archive/,
+# 'week_YYYY_NN' for weeks/), counter path (keys joined with '/') and value.
+# Trends are read from there instead of loading the whole snapshots.
+def util_stats_open(fileName):
+    db = sqlite3.connect(fileName)
+    # no type on value, so integers stay integers
+    db.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT, path TEXT, value, PRIMARY KEY (name, path)) WITHOUT ROWID')
+    return db
+
+
+
+def util_stats_rows(name, tree, path=''):
+    for key, x in tree.items():
+      if type(x) is dict:
+        yield from util_stats_rows(name, x, path + str(key) + '/')
+      elif type(x) in (int, float):
+        yield (name, path + str(key), x)
+
+
+
+def util_stats_store(fileName, name, data):
+    db = util_stats_open(fileName)
+    try:
+      with db:
+        db.execute('DELETE FROM stats WHERE name = ?', (name,))
+        db.executemany('INSERT INTO stats VALUES (?, ?, ?)', util_stats_rows(name, data))
+    finally:
+      db.close()
+
+
+
+def util_stats_query(fileName, names, pathList):
+    # returns {name: {path: value}} for the paths in pathList and everything below them
+    result = {name: {} for name in names}
+    db = util_stats_open(fileName)
+    try:
+      for name in names:
+        for path in pathList:
+          # '0' follows '/', so the range holds everything below path
+          for x, value in db.execute('SELECT path, value FROM stats WHERE name = ? AND (path = ? OR (path > ? AND path < ?))',
+                                     (name, path, path + '/', path + '0')):
+            result[name][x] = value
+    finally:
+      db.close()
+    return {name: x for name, x in result.items() if x}
+
+
+
+# Profiling of the esc scripts. util_profile_call() runs a stage (get_*, load_*,
+# analyze_*, report_*, ...) and notes wall and cpu time (of the thread, stages
+# run in threads in esc-collect), cpu of child processes, peak rss and counts.
+# util_profile_finish() appends the run as one JSON line to dump/profile.jsonl, so
+# nights can be compared. With cfg['profile']['cprofile'] every stage also dumps
+# its cProfile statistics to dump/profile/<script>_<stage>.prof.
+def util_profile_start(cfg, script):
+    global profileRun
+
+    profileRun = {'script': script,
+                  'date': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                  'homedir': cfg['homedir'],
+                  'cprofile': cfg.get('profile', {}).get('cprofile', False),
+                  'start': (time.perf_counter(), time.process_time()),
+                  'stages': []}
+
+
+
+def util_profile_rss():
+    if resource is None:
+      return None
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    x = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return x if sys.platform == 'darwin' else x * 1024
+
+
+
+def util_profile_children():
+    if resource is None:
+      return 0.0
+    x = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return x.ru_utime + x.ru_stime
+
+
+
+def util_profile_sizes(rawList):
+    # the number of entries of a dump (bugs, patch, commits, ...) as counts of a stage
+    if type(rawList) is not dict:
+      return None
+    return {i: len(x) for i, x in rawList.items() if type(x) in (dict, list)}
+
+
+
+def util_profile_count(name, n):
+    # adds to the counts of the innermost stage running in this thread
+    stack = getattr(profileLocal, 'stack', None)
+    if stack:
+      stack[-1]['counts'][name] = stack[-1]['counts'].get(name, 0) + n
+
+
+
+def util_profile_call(name, func, *args, count=None):
+    # count is a dict of counts, or a function of the result returning one
+    if profileRun is None:
+      return func(*args)
+
+    stage = {'stage': name, 'status': 'ok', 'counts': {}}
+    if not hasattr(profileLocal, 'stack'):
+      profileLocal.stack = []
+    profileLocal.stack.append(stage)
+    profiler = None
+    if profileRun['cprofile'] and len(profileLocal.stack) == 1:
+      profiler = cProfile.Profile()
+      try:
+        profiler.enable()
+      except ValueError:
+        # only one profiler can run at a time (threads of esc-collect)
+        profiler = None
+    rss = util_profile_rss()
+    start = (time.perf_counter(), time.thread_time(), util_profile_children())
+    try:
+      result = func(*args)
+      if callable(count):
+        count = count(result)
+      if count:
+        stage['counts'].update(count)
+      return result
+    except BaseException:
+      stage['status'] = 'failed'
+      raise
+    finally:
+      stage['at'] = round(start[0] - profileRun['start'][0], 3)
+      stage['wall'] = round(time.perf_counter() - start[0], 3)
+      stage['cpu'] = round(time.thread_time() - start[1], 3)
+      stage['childCpu'] = round(util_profile_children() - start[2], 3)
+      stage['maxrss'] = util_profile_rss()
+      if rss is not None:
+        stage['rssGrowth'] = stage['maxrss'] - rss
+      if profiler is not None:
+        profiler.disable()
+        os.makedirs(profileRun['homedir'] + 'dump/profile', exist_ok=True)
+        profiler.dump_stats(profileRun['homedir'] + 'dump/profile/' + profileRun['script'] + '_' + name + '.prof')
+      profileLocal.stack.pop()
+      with profileLock:
+        profileRun['stages'].append(stage)
+
+
+
+def util_profile_finish():
+    global profileRun
+
+    if profileRun is None:
+      return
+    run = profileRun
+    profileRun = None
+    start = run.pop('start')
+    run['wall'] = round(time.perf_counter() - start[0], 3)
+    run['cpu'] = round(time.process_time() - start[1], 3)
+    run['childCpu'] = round(util_profile_children(), 3)
+    run['maxrss'] = util_profile_rss()
+    fileName = run.pop('homedir') + 'dump/profile.jsonl'
+    del run['cprofile']
+    try:
+      with open(fileName, 'a', encoding='utf-8') as fp:
+        print(json.dumps(run), file=fp)
+    except Exception as e:
+      print('Error dump file ' + fileName + ' due to ' + str(e))
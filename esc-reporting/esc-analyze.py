@@ -20,10 +20,13 @@
 #      esc/stats.json (the daily data)
 #      esc/archive/stats_YYYY_MM_DD.json (copy of stats.json)
 #      esc/weeks/week_YYYY_NN.json (thursday copy of stats.json)
+#      esc/stats.sqlite (the counters of both, see common.util_stats_store())
 #
 # The analyze functions run through the data files and generates interesting numbers
 # You can add your own analyze function (see analyze_myfunc() for example).
 # The numbers are stored in stats.json, and a diff with last weeks numbers are automatically build
+# Bugzilla is read in one pass by analyze_bugzilla(), analyze functions that need bugs register
+# a stage with handlers there instead of looping over bugzillaData['bugs'] themselves.
 #
 # dump/developers_dump.json is used to identify:
 #   new contributors
@@ -55,8 +58,20 @@ import json
 import xmltodict
 import re
 import gzip
+import bisect
+import functools
+import copy
+import gc
+import multiprocessing
+import pickle
 from shutil import copyfile
 
+# numpy is optional, util_build_period_stat() counts directly without it
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 def util_load_file(fileName, isJson=True):
     try:
@@ -105,25 +120,42 @@ def util_load_csv(fileName, split):
 
 
 def util_dump_file(fileName, rawList):
+    # write to a temporary file and rename it, so the old dump stays intact if we fail or get killed
     try:
-      fp = open(fileName, 'w', encoding='utf-8')
+      fp = open(fileName + '.tmp', 'w', encoding='utf-8')
       json.dump(rawList, fp, ensure_ascii=False, indent=4, sort_keys=True)
       fp.close()
+      os.replace(fileName + '.tmp', fileName)
     except Exception as e:
       print('Error dump file ' + fileName + ' due to ' + str(e))
-      os.remove(fileName)
+      if os.path.isfile(fileName + '.tmp'):
+        os.remove(fileName + '.tmp')
       exit(-1)
 
 
 
 def util_build_period_stat(xDate, email, base, peopleTarget=None, dataTarget=None):
-    global cfg, statList
+    global cfg, statList, periodTable
 
     xType = 'contributor'
+    if email and statList['people'][email]['isCommitter'] and base != 'ui':
+      xType = 'committer'
+
+    if periodTable is not None:
+      # only remember the event, util_flush_period_stat() counts them all at once
+      key = (email, base, peopleTarget, xType, dataTarget)
+      index = periodTable['keys'].get(key)
+      if index is None:
+        index = periodTable['keys'][key] = len(periodTable['keys'])
+      periodTable['date'].append(xDate)
+      periodTable['key'].append(index)
+      if 'cut' in periodTable:
+        # runUpgrade(), the first week with cutDate >= cut counts the event
+        periodTable['cut'].append(xDate if periodCut is None else periodCut)
+      return
+
     if email:
       statList['people'][email][base]['total'] += 1
-      if statList['people'][email]['isCommitter'] and base != 'ui':
-        xType = 'committer'
     if dataTarget:
       statList['data'][base][xType]['total'] += 1
 
@@ -136,14 +168,88 @@ def util_build_period_stat(xDate, email, base, peopleTarget=None, dataTarget=Non
 
 
 
-def util_load_data_file(fileName):
-    rawList = util_load_file(fileName)
+def util_start_period_table():
+    global periodTable
+
+    # collect the events of util_build_period_stat() in a table (needs numpy)
+    if numpy is None:
+      periodTable = None
+    else:
+      periodTable = {'keys': {}, 'date': [], 'key': []}
+
+
+
+def util_flush_period_stat():
+    global cfg, statList, periodTable
+
+    # must be called before anything reads the period counters
+    if periodTable is None:
+      return
+    table = periodTable
+    periodTable = None
+    if not table['key']:
+      return
+
+    keyList = list(table['keys'])
+    # converting to datetime64 is slow, comparing datetime objects in numpy is not
+    dates = numpy.array(table['date'], dtype=object)
+    keys = numpy.array(table['key'], dtype=numpy.intp)
+    periodDates = {i: cfg[i + 'Date'] for i in ('1year', '3month', '1month', '1week')}
+    counts = util_count_period_table(dates, keys, len(keyList), periodDates)
+    util_add_period_counts(keyList, counts, statList['people'], statList['data'])
+
+
+
+def util_count_period_table(dates, keys, size, periodDates):
+    counts = {'total': numpy.bincount(keys, minlength=size).tolist()}
+    for i in '1year', '3month', '1month', '1week':
+      inPeriod = dates >= periodDates[i]
+      counts[i] = numpy.bincount(keys[inPeriod], minlength=size).tolist()
+    return counts
+
+
+
+def util_add_period_counts(keyList, counts, peopleList, dataList):
+    # peopleList is None when only the data counters are wanted
+    for index, (email, base, peopleTarget, xType, dataTarget) in enumerate(keyList):
+      # keys without events (retracted by util_scan_incremental()) may name people not seen this run
+      if not counts['total'][index]:
+        continue
+      if email and peopleList is not None:
+        person = peopleList[email][base]
+        person['total'] += counts['total'][index]
+      else:
+        peopleTarget = None
+      if dataTarget:
+        data = dataList[base][xType]
+        data['total'] += counts['total'][index]
+      for i in '1year', '3month', '1month', '1week':
+        x = counts[i][index]
+        if x:
+          if peopleTarget:
+            person[i][peopleTarget] += x
+          if dataTarget:
+            data[i][dataTarget] += x
+
+
+
+def util_load_data_file(fileName, useSnapshot=True, compact=False):
+    if useSnapshot:
+      rawList = common.util_load_snapshot(fileName, compact)
+    else:
+      rawList = common.util_load_dump(fileName)
     if rawList == None:
       exit(-1)
     return rawList
 
 
 
+def util_profile_load(fileName, compact=False):
+    return common.util_profile_call('load_' + fileName.split('.')[0], util_load_data_file, cfg['homedir'] + 'dump/' + fileName,
+                                    True, compact, count=common.util_profile_sizes)
+
+
+
 def util_create_person_gerrit(person, email):
     return { 'name': person,
              'email': email,
@@ -235,9 +341,12 @@ def util_create_statList():
                        },
                      'reportList': {}}
 
-def util_check_mail(name, xmail):
+@functools.lru_cache(maxsize=65536)
+def util_normalize_mail(xmail):
     global statList
 
+    # the same addresses are seen over and over again, so the result is cached,
+    # util_clear_mail_cache() must be called when the aliases change
     if xmail.lower() == '*dummy*':
         mail = xmail.lower()
     else:
@@ -250,6 +359,19 @@ def util_check_mail(name, xmail):
 
     if mail in statList['aliases']:
       mail = statList['aliases'][mail]
+    return mail
+
+
+
+def util_clear_mail_cache():
+    util_normalize_mail.cache_clear()
+
+
+
+def util_check_mail(name, xmail):
+    global statList
+
+    mail = util_normalize_mail(xmail)
     if not mail in statList['people']:
       statList['people'][mail] = util_create_person_gerrit(name, mail)
       if mail == '*dummy*':
@@ -261,22 +383,107 @@ def util_check_mail(name, xmail):
 
 
 
-def util_build_diff(newList, oldList):
+def util_scan_call(stage, event, *args):
+    global cfg
+
+    if not event in stage:
+      return None
+    try:
+      return stage[event](stage, *args)
+    except Exception as e:
+      # like the old analyze functions, a failing stage stops but the others continue
+      stage['failed'] = True
+      common.util_errorMail(cfg, 'esc-analyze', 'ERROR: ' + stage['name'] + ' failed with ' + str(e))
+      return None
+
+
+
+def util_scan_mail(stage, name, xmail):
+    global statList, bugScanPeople, bugScanNames, bugScanIndex, bugScanTouches
+
+    # The stages used to run one after the other, so a person seen first in the bug scan
+    # was created by the first stage (in that order) that saw it, and got a name from
+    # the first later call that had one. Remember both, util_scan_people() restores it.
+    cnt = len(statList['people'])
+    mail = util_check_mail(name, xmail)
+    touch = (stage['index'], bugScanIndex, stage['seq'])
+    stage['seq'] += 1
+    if bugScanTouches is not None:
+      # recording a bug for util_scan_incremental()
+      bugScanTouches.append((mail, name, touch[0], touch[2]))
+    if len(statList['people']) != cnt:
+      bugScanPeople[mail] = {'first': touch, 'name': name, 'named': None, 'realName': None}
+    elif not mail in bugScanPeople:
+      # known people get the first name in scan order, needed to merge shards
+      if name and name != '*UNKNOWN*' and not mail in bugScanNames:
+        bugScanNames[mail] = ((bugScanIndex, stage['index'], touch[2]), name)
+      return mail
+
+    person = bugScanPeople[mail]
+    if touch < person['first']:
+      person['first'] = touch
+      person['name'] = name
+    if name and name != '*UNKNOWN*' and (person['named'] is None or touch < person['named']):
+      person['named'] = touch
+      person['realName'] = name
+    return mail
+
+
+
+def util_scan_people():
+    global statList, bugScanPeople
+
+    for mail in sorted(bugScanPeople, key=lambda x: bugScanPeople[x]['first']):
+      touch = bugScanPeople[mail]
+      person = statList['people'].pop(mail)
+      person['name'] = touch['name']
+      if person['name'] == '*UNKNOWN*' and touch['realName'] is not None:
+        person['name'] = touch['realName']
+      statList['people'][mail] = person
+
+
+
+# the subtrees of statList['data'] esc-report reads from statList['diff']
+diffList = ['commits', 'gerrit', 'ui', 'qa', 'esc']
+
+def util_build_diff(newList, oldList, keyList=None):
+    # newList - oldList for every number in newList, 0 when oldList has none to compare,
+    # with keyList only for these keys of newList
     result = {}
-    for i in newList:
+    for i, x in newList.items():
+      if keyList is not None and not i in keyList:
+        continue
       if not i in oldList:
-        oldList[i] = newList[i]
-      if type(newList[i]) is dict:
+        result[i] = util_build_diff(x, x) if type(x) is dict else x - x
+      elif type(x) is dict:
         if not type(oldList[i]) is dict:
           result[i] = 0
         else:
-          result[i] = util_build_diff(newList[i], oldList[i])
+          result[i] = util_build_diff(x, oldList[i])
       else:
-          result[i] = newList[i] - oldList[i]
+          result[i] = x - oldList[i]
     return result
 
 
 
+def util_load_week():
+    global cfg, weekList
+
+    # the archive of a week ago, only read when a stage compares with it
+    if weekList is None:
+      x = (cfg['nowDate'] - datetime.timedelta(days=7)).strftime('%Y-%m-%d')
+      gzFilePath = cfg['homedir'] + 'archive/stats_' + x + '.json.gz'
+      if os.path.isfile(gzFilePath):
+        with gzip.open(gzFilePath, 'rt', encoding='utf-8') as fp:
+          content = fp.read()
+        if content:
+          weekList = json.loads(content)
+      if not weekList:
+        weekList = util_create_statList()
+    return weekList
+
+
+
 def analyze_mentoring():
     global cfg, statList, openhubData, bugzillaData, gerritData, gitData, committersNames
 
@@ -365,147 +572,185 @@ def analyze_mentoring():
         util_build_period_stat(xDate, committer, 'commits', dataTarget='reviewMerged', peopleTarget='reviewMerged')
 
     print(" from " + statOldDate.strftime("%Y-%m-%d") + " to " + statNewDate.strftime("%Y-%m-%d"))
-    print("mentoring: analyze easyhacks", end="", flush=True)
 
-    statNewDate = cfg['1yearDate']
-    statOldDate = cfg['nowDate']
-    for key, row in bugzillaData['bugs'].items():
-      if row['status'] == 'RESOLVED' or row['status'] == 'VERIFIED' or not 'easyHack' in row['keywords']:
-        continue
 
-      xDate = datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ")
-      if xDate > cfg['cutDate']:
-        continue
-      if xDate < statOldDate:
-        statOldDate = xDate
-      if xDate > statNewDate:
-        statNewDate = xDate
 
-      statList['data']['easyhacks']['total'] += 1
-      bugBlocked = False
-      if 'needsDevEval' in row['keywords']:
-        statList['data']['easyhacks']['needsDevEval'] += 1
-        bugBlocked = True
-      if 'needsUXEval' in row['keywords']:
-        statList['data']['easyhacks']['needsUXEval'] += 1
-        bugBlocked = True
+# The bugzilla part of the analyze functions is done in one pass over all bugs by
+# analyze_bugzilla(). Each stage is a dict of handlers, called with the stage itself
+# (to keep state) in this order:
+#   prepare(stage)                        before the scan
+#   bug(stage, key, row)                  for every bug, returns True to get the events below
+#   comment(stage, comment, xDate)        for every comment of the bug
+#   history(stage, change, xDate)         for every history entry of the bug
+#   end(stage, key, row)                  after the events of the bug
+#   merge(stage, part)                    only with shards, adds the state of a shard
+#   finish(stage)                         after the scan
+# The timestamps are decoded by the loader (common.util_decode_bugs()).
+def easyhacks_scan_prepare(stage):
+    print("mentoring: analyze easyhacks", flush=True)
+    stage['newDate'] = cfg['1yearDate']
+    stage['oldDate'] = cfg['nowDate']
 
-      if row['status'] == 'NEEDINFO':
-        bugBlocked = True
-      elif row['status'] == 'ASSIGNED':
-        statList['data']['easyhacks']['assigned'] += 1
-      elif row['status'] == 'NEW' and not bugBlocked:
-        statList['data']['easyhacks']['open'] += 1
 
-      if len(row['comments']) >= 5:
-        statList['data']['easyhacks']['cleanup_comments'] += 1
 
-    print(" from " + statOldDate.strftime("%Y-%m-%d") + " to " + statNewDate.strftime("%Y-%m-%d"))
+def easyhacks_scan_bug(stage, key, row):
+    global cfg, statList
 
+    if row['status'] == 'RESOLVED' or row['status'] == 'VERIFIED' or not 'easyHack' in row['keywords']:
+      return False
+
+    xDate = row['last_change_date']
+    if xDate > cfg['cutDate']:
+      return False
+    if xDate < stage['oldDate']:
+      stage['oldDate'] = xDate
+    if xDate > stage['newDate']:
+      stage['newDate'] = xDate
+
+    statList['data']['easyhacks']['total'] += 1
+    bugBlocked = False
+    if 'needsDevEval' in row['keywords']:
+      statList['data']['easyhacks']['needsDevEval'] += 1
+      bugBlocked = True
+    if 'needsUXEval' in row['keywords']:
+      statList['data']['easyhacks']['needsUXEval'] += 1
+      bugBlocked = True
+
+    if row['status'] == 'NEEDINFO':
+      bugBlocked = True
+    elif row['status'] == 'ASSIGNED':
+      statList['data']['easyhacks']['assigned'] += 1
+    elif row['status'] == 'NEW' and not bugBlocked:
+      statList['data']['easyhacks']['open'] += 1
+
+    if len(row['comments']) >= 5:
+      statList['data']['easyhacks']['cleanup_comments'] += 1
+    return False
 
 
-def analyze_ui():
-    global cfg, statList, bugzillaData
 
-    print("ui: analyze bugzilla", flush=True)
+def easyhacks_scan_merge(stage, part):
+    if part['oldDate'] < stage['oldDate']:
+      stage['oldDate'] = part['oldDate']
+    if part['newDate'] > stage['newDate']:
+      stage['newDate'] = part['newDate']
 
-    for key, row in bugzillaData['bugs'].items():
-      xDate = datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ")
-      if xDate > cfg['cutDate']:
-        continue
 
-      if not 'topicUI' in row['keywords'] and not 'needsUXEval' in row['keywords']:
-        continue
 
-      for change in row['comments']:
-        email = util_check_mail('*UNKNOWN*', change['creator'])
-        xDate = datetime.datetime.strptime(change['creation_time'], "%Y-%m-%dT%H:%M:%SZ")
-        util_build_period_stat(xDate, email, 'ui', dataTarget='commented', peopleTarget='commented')
+def easyhacks_scan_finish(stage):
+    print("mentoring: easyhacks from " + stage['oldDate'].strftime("%Y-%m-%d") + " to " + stage['newDate'].strftime("%Y-%m-%d"))
 
-      for change in row['history']:
-        email = util_check_mail('*UNKNOWN*', change['who'])
-        xDate = datetime.datetime.strptime(change['when'], "%Y-%m-%dT%H:%M:%SZ")
-        for entry in change['changes']:
-          util_build_period_stat(xDate, email, 'ui', peopleTarget='history')
 
-      if row['status'] == 'RESOLVED' or row['status'] == 'CLOSED' or row['status'] == 'VERIFIED':
-        util_build_period_stat(xDate, None, 'ui', dataTarget='resolved')
-        continue
 
-      if 'needsUXEval' in row['keywords']:
-        statList['data']['ui']['needsUXEval'] += 1
-
-      if 'topicUI' in row['keywords']:
-        statList['data']['ui']['topicUI'] += 1
-
-      for change in row['history']:
-        email = util_check_mail('*UNKNOWN*', change['who'])
-        xDate = datetime.datetime.strptime(change['when'], "%Y-%m-%dT%H:%M:%SZ")
-        for entry in change['changes']:
-          if 'needsUXEval' in entry['added']:
-            util_build_period_stat(xDate, email, 'ui', dataTarget='added')
-          if 'needsUXEval' in entry['removed']:
-            util_build_period_stat(xDate, email, 'ui', dataTarget='removed')
-
-
-
-def analyze_qa():
-    global cfg, statList, bugzillaData
-
-    print("qa: analyze bugzilla", flush=True)
-
-    for key, row in bugzillaData['bugs'].items():
-	    #Ignore META bugs and deletionrequest bugs.
-      if not row['summary'].startswith('[META]') \
-		      and row['component'] != 'deletionrequest':
-        email = util_check_mail(row['creator_detail']['real_name'], row['creator'])
-        xDate = datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ")
-        creationDate = datetime.datetime.strptime(row['creation_time'], "%Y-%m-%dT%H:%M:%SZ")
-
-        if row['status'] == 'UNCONFIRMED':
-          statList['data']['qa']['unconfirmed']['count'] += 1
-          if 'needsUXEval' in row['keywords']:
-            statList['data']['qa']['unconfirmed']['needsUXEval'] += 1
-          if 'needsDevAdvice' in row['keywords']:
-            statList['data']['qa']['unconfirmed']['needsDevAdvice'] += 1
-          if 'haveBacktrace' in row['keywords']:
-            statList['data']['qa']['unconfirmed']['haveBacktrace'] += 1
-          if row['severity'] == 'enhancement':
-            statList['data']['qa']['unconfirmed']['enhancement'] += 1
-          if row['component'] == 'Documentation':
-            statList['data']['qa']['unconfirmed']['documentation'] += 1
-          if row['component'] == 'Android app' or row['component'] == 'Android Viewer':
-            statList['data']['qa']['unconfirmed']['android'] += 1
-          if row['component'] == 'iOS':
-            statList['data']['qa']['unconfirmed']['ios'] += 1
-          if row['product'] == 'LibreOffice Online':
-            statList['data']['qa']['unconfirmed']['online'] += 1
-
-        util_build_period_stat(creationDate, email, 'qa', 'owner')
+def ui_scan_bug(stage, key, row):
+    global cfg
 
-        for change in row['history']:
-          email = util_check_mail('*UNKNOWN*', change['who'])
-          xDate = datetime.datetime.strptime(change['when'], "%Y-%m-%dT%H:%M:%SZ")
-          for entry in change['changes']:
-            if entry['field_name'] == 'keywords':
-              keywordsAdded = entry['added'].split(", ")
-              for keyword in keywordsAdded:
-                if keyword == 'bisected' and 'bisected' in row['keywords']:
-                  util_build_period_stat(xDate, email, 'qa', 'bisected')
-                if keyword == 'bibisected' and 'bibisected' in row['keywords']:
-                  util_build_period_stat(xDate, email, 'qa', 'bibisected')
-                if keyword == 'regression' and 'regression' in row['keywords']:
-                  util_build_period_stat(xDate, email, 'qa', 'regression')
-                if keyword == 'haveBacktrace' and 'haveBacktrace' in row['keywords']:
-                  util_build_period_stat(xDate, email, 'qa', 'backtrace')
-            elif entry['field_name'] == 'resolution':
-              if entry['added'] == 'FIXED' and row['resolution'] == 'FIXED':
-                util_build_period_stat(xDate, email, 'qa', 'fixed')
-
-
-
-def analyze_esc():
-    global cfg, statList, bugzillaData, bugzillaESCData, crashData, weekList
+    xDate = row['last_change_date']
+    if xDate > cfg['cutDate']:
+      return False
+
+    if not 'topicUI' in row['keywords'] and not 'needsUXEval' in row['keywords']:
+      return False
+
+    # xDate ends up as the date of the last history entry (or comment), which is used for 'resolved'
+    stage['xDate'] = xDate
+    stage['resolved'] = row['status'] == 'RESOLVED' or row['status'] == 'CLOSED' or row['status'] == 'VERIFIED'
+    return True
+
+
+
+def ui_scan_comment(stage, comment, xDate):
+    email = util_scan_mail(stage, '*UNKNOWN*', comment['creator'])
+    stage['xDate'] = xDate
+    util_build_period_stat(xDate, email, 'ui', dataTarget='commented', peopleTarget='commented')
+
+
+
+def ui_scan_history(stage, change, xDate):
+    email = util_scan_mail(stage, '*UNKNOWN*', change['who'])
+    stage['xDate'] = xDate
+    for entry in change['changes']:
+      util_build_period_stat(xDate, email, 'ui', peopleTarget='history')
+      if not stage['resolved']:
+        if 'needsUXEval' in entry['added']:
+          util_build_period_stat(xDate, email, 'ui', dataTarget='added')
+        if 'needsUXEval' in entry['removed']:
+          util_build_period_stat(xDate, email, 'ui', dataTarget='removed')
+
+
+
+def ui_scan_end(stage, key, row):
+    global statList
+
+    if stage['resolved']:
+      util_build_period_stat(stage['xDate'], None, 'ui', dataTarget='resolved')
+      return
+
+    if 'needsUXEval' in row['keywords']:
+      statList['data']['ui']['needsUXEval'] += 1
+
+    if 'topicUI' in row['keywords']:
+      statList['data']['ui']['topicUI'] += 1
+
+
+
+def qa_scan_bug(stage, key, row):
+    global cfg, statList
+
+    #Ignore META bugs and deletionrequest bugs.
+    if row['summary'].startswith('[META]') or row['component'] == 'deletionrequest':
+      return False
+
+    email = util_scan_mail(stage, row['creator_detail']['real_name'], row['creator'])
+    stage['keywords'] = row['keywords']
+    stage['resolution'] = row['resolution']
+
+    if row['status'] == 'UNCONFIRMED':
+      statList['data']['qa']['unconfirmed']['count'] += 1
+      if 'needsUXEval' in row['keywords']:
+        statList['data']['qa']['unconfirmed']['needsUXEval'] += 1
+      if 'needsDevAdvice' in row['keywords']:
+        statList['data']['qa']['unconfirmed']['needsDevAdvice'] += 1
+      if 'haveBacktrace' in row['keywords']:
+        statList['data']['qa']['unconfirmed']['haveBacktrace'] += 1
+      if row['severity'] == 'enhancement':
+        statList['data']['qa']['unconfirmed']['enhancement'] += 1
+      if row['component'] == 'Documentation':
+        statList['data']['qa']['unconfirmed']['documentation'] += 1
+      if row['component'] == 'Android app' or row['component'] == 'Android Viewer':
+        statList['data']['qa']['unconfirmed']['android'] += 1
+      if row['component'] == 'iOS':
+        statList['data']['qa']['unconfirmed']['ios'] += 1
+      if row['product'] == 'LibreOffice Online':
+        statList['data']['qa']['unconfirmed']['online'] += 1
+
+    util_build_period_stat(row['creation_date'], email, 'qa', 'owner')
+    return True
+
+
+
+def qa_scan_history(stage, change, xDate):
+    email = util_scan_mail(stage, '*UNKNOWN*', change['who'])
+    for entry in change['changes']:
+      if entry['field_name'] == 'keywords':
+        keywordsAdded = entry['added'].split(", ")
+        for keyword in keywordsAdded:
+          if keyword == 'bisected' and 'bisected' in stage['keywords']:
+            util_build_period_stat(xDate, email, 'qa', 'bisected')
+          if keyword == 'bibisected' and 'bibisected' in stage['keywords']:
+            util_build_period_stat(xDate, email, 'qa', 'bibisected')
+          if keyword == 'regression' and 'regression' in stage['keywords']:
+            util_build_period_stat(xDate, email, 'qa', 'regression')
+          if keyword == 'haveBacktrace' and 'haveBacktrace' in stage['keywords']:
+            util_build_period_stat(xDate, email, 'qa', 'backtrace')
+      elif entry['field_name'] == 'resolution':
+        if entry['added'] == 'FIXED' and stage['resolution'] == 'FIXED':
+          util_build_period_stat(xDate, email, 'qa', 'fixed')
+
+
+
+def esc_scan_prepare(stage):
+    global cfg, statList, bugzillaData, bugzillaESCData
 
     print("esc: analyze bugzilla", flush=True)
 
@@ -530,41 +775,69 @@ def analyze_esc():
     for id in bugzillaESCData['HighSeverityBugs']['list']:
       statList['escList']['HighSeverityBugs'][id] = bugzillaData['bugs'][id]['summary']
 
+    stage['fixers'] = []
+    stage['confirmers'] = []
+
+
+
+def esc_scan_bug(stage, key, row):
+    stage['fixer'] = None
+    stage['confirmer'] = None
+    return ((row['status'] == 'RESOLVED' or row['status'] == 'VERIFIED' or row['status'] == 'CLOSED') and 'FIXED' == row['resolution']) or \
+           row['is_confirmed']
+
+
+
+def esc_scan_history(stage, change, xDate):
+    global cfg
+
+    # the oldest matching change of the last week counts
+    if xDate >= cfg['1weekDate']:
+      for entry in change['changes']:
+        if entry['field_name'] == 'resolution' and entry['added'] == 'FIXED' and stage['fixer'] is None:
+          stage['fixer'] = change['who'].lower()
+        if entry['field_name'] == 'is_confirmed' and entry['added'] == '1' and stage['confirmer'] is None:
+          stage['confirmer'] = change['who'].lower()
+
+
+
+def esc_scan_end(stage, key, row):
+    global statList
+
+    for i in 'fixer', 'confirmer':
+      x = stage[i]
+      if x and x != 'libreoffice-commits@lists.freedesktop.org':
+        if x in statList['aliases']:
+          x = statList['aliases'][x]
+        stage[i + 's'].append(x)
+
+
+
+def esc_scan_merge(stage, part):
+    stage['fixers'] += part['fixers']
+    stage['confirmers'] += part['confirmers']
+
+
+
+def esc_scan_finish(stage):
+    global cfg, statList, bugzillaESCData, crashData, weekList
+
+    # names are looked up once all people of the scan are known
     bug_fixers = {}
+    for fixer in stage['fixers']:
+      if fixer in statList['people']:
+        fixer = statList['people'][fixer]['name']
+      if not fixer in bug_fixers:
+        bug_fixers[fixer] = 0
+      bug_fixers[str(fixer)] += 1
+
     bug_confirmers = {}
-    for id, bug in bugzillaData['bugs'].items():
-      if ((bug['status'] == 'RESOLVED' or bug['status'] == 'VERIFIED' or bug['status'] == 'CLOSED') and 'FIXED' == bug['resolution']) or \
-          bug['is_confirmed']:
-
-        fixer = None
-        confirmer = None
-        for i in range(len(bug['history'])-1,-1,-1):
-          changes = bug['history'][i]['changes']
-          when = datetime.datetime.strptime(bug['history'][i]['when'], "%Y-%m-%dT%H:%M:%SZ")
-          for j in range(0,len(changes)):
-            if when >= cfg['1weekDate']:
-              if changes[j]['field_name'] == 'resolution' and changes[j]['added'] == 'FIXED':
-                fixer = bug['history'][i]['who'].lower()
-              if changes[j]['field_name'] == 'is_confirmed' and changes[j]['added'] == '1':
-                confirmer = bug['history'][i]['who'].lower()
-
-        if fixer and fixer != 'libreoffice-commits@lists.freedesktop.org':
-          if fixer in statList['aliases']:
-            fixer = statList['aliases'][fixer]
-          if fixer in statList['people']:
-            fixer = statList['people'][fixer]['name']
-          if not fixer in bug_fixers:
-            bug_fixers[fixer] = 0
-          bug_fixers[str(fixer)] += 1
-
-        if confirmer and confirmer != 'libreoffice-commits@lists.freedesktop.org':
-          if confirmer in statList['aliases']:
-            confirmer = statList['aliases'][confirmer]
-          if confirmer in statList['people']:
-            confirmer = statList['people'][confirmer]['name']
-          if not confirmer in bug_confirmers:
-            bug_confirmers[confirmer] = 0
-          bug_confirmers[str(confirmer)] += 1
+    for confirmer in stage['confirmers']:
+      if confirmer in statList['people']:
+        confirmer = statList['people'][confirmer]['name']
+      if not confirmer in bug_confirmers:
+        bug_confirmers[confirmer] = 0
+      bug_confirmers[str(confirmer)] += 1
 
     statList['escList']['QAstat']['top15_fixers'] = bug_fixers
     statList['escList']['QAstat']['top15_confirmers'] = bug_confirmers
@@ -573,11 +846,11 @@ def analyze_esc():
       statList['data']['esc']['MAB'][id] = row
       statList['data']['esc']['MAB'][id]['%'] = int((row['open'] / row['total'])*100)
 
-    statList['escList']['bisect'] = weekList['escList']['bisect']
+    statList['escList']['bisect'] = util_load_week()['escList']['bisect']
     statList['escList']['bisect'].insert(0, [bugzillaESCData['ESC_BISECTED_UPDATE']['open'],
                                              bugzillaESCData['ESC_BISECTED_UPDATE']['total']])
     del statList['escList']['bisect'][-1]
-    statList['escList']['bibisect'] = weekList['escList']['bibisect']
+    statList['escList']['bibisect'] = util_load_week()['escList']['bibisect']
     statList['escList']['bibisect'].insert(0, [bugzillaESCData['ESC_BIBISECTED_UPDATE']['open'],
                                                bugzillaESCData['ESC_BIBISECTED_UPDATE']['total']])
     del statList['escList']['bibisect'][-1]
@@ -585,9 +858,9 @@ def analyze_esc():
     statList['data']['esc']['regression'] = {}
     statList['data']['esc']['regression']['high'] = bugzillaESCData['ESC_REGRESSION_UPDATE']['high']
     statList['data']['esc']['regression']['open'] = bugzillaESCData['ESC_REGRESSION_UPDATE']['open']
-    statList['data']['esc']['regression']['open-1'] = weekList['data']['esc']['regression']['open']
+    statList['data']['esc']['regression']['open-1'] = util_load_week()['data']['esc']['regression']['open']
     statList['data']['esc']['regression']['total'] = bugzillaESCData['ESC_REGRESSION_UPDATE']['total']
-    statList['data']['esc']['regression']['total-1'] = weekList['data']['esc']['regression']['total']
+    statList['data']['esc']['regression']['total-1'] = util_load_week()['data']['esc']['regression']['total']
 
     statList['data']['esc']['component'] = {}
     statList['data']['esc']['component']['high'] = {}
@@ -623,6 +896,60 @@ def is_domain_mapped(email):
         return True
     return False
 
+def reports_scan_prepare(stage):
+    stage['reportList'] = {'needsDevEval': [],
+                           'needsUXEval': [],
+                           'needinfo': [],
+                           'too_many_comments': [],
+                           'to_be_closed': [],
+                           'easyhacks_new': []}
+    stage['missing_cc'] = {}
+    stage['remove_cc'] = {}
+
+
+
+def reports_scan_bug(stage, key, row):
+    global cfg
+
+    if not 'cc' in row:
+      row['cc'] = []
+    if not 'keywords' in row:
+      row['keywords'] = []
+
+    if row['status'] == 'RESOLVED' or row['status'] == 'VERIFIED':
+      return False
+
+    if not 'easyHack' in row['keywords']:
+      if 'mentoring' in row['cc']:
+          stage['remove_cc'][key] = 0
+      return False
+
+    if 'needsDevEval' in row['keywords']:
+        stage['reportList']['needsDevEval'].append(key)
+    if 'needsUXEval' in row['keywords']:
+        stage['reportList']['needsUXEval'].append(key)
+    if row['status'] == 'NEEDINFO':
+        stage['reportList']['needinfo'].append(key)
+    if len(row['comments']) >= 5:
+      stage['reportList']['too_many_comments'].append(key)
+    if not 'mentoring@documentfoundation.org' in row['cc']:
+        stage['missing_cc'][key] = 0
+    if row['comments'][-1]['creator'] == 'libreoffice-commits@lists.freedesktop.org' and not key in cfg['bugzilla']['close_except']:
+        stage['reportList']['to_be_closed'].append(key)
+    if row['creation_date'] >= cfg['1weekDate'] or (len(row['history']) > 0 and 'easyhack' in row['history'][-1]['changes'][0]['added']):
+      stage['reportList']['easyhacks_new'].append(key)
+    return False
+
+
+
+def reports_scan_merge(stage, part):
+    for i in stage['reportList']:
+      stage['reportList'][i] += part['reportList'][i]
+    stage['missing_cc'].update(part['missing_cc'])
+    stage['remove_cc'].update(part['remove_cc'])
+
+
+
 def analyze_reports():
     global cfg, statList, openhubData, bugzillaData, gerritData, gitData, automateData, committersNames
 
@@ -642,7 +969,7 @@ def analyze_reports():
                               'top10review': [],
                               'abandonedPatches': []}
     fileAutomate = cfg['homedir'] + 'automateTODO.json'
-    automateList = util_load_data_file(fileAutomate)
+    automateList = util_load_data_file(fileAutomate, useSnapshot=False)
     automateList['gerrit']['to_abandon_abandon'] = {}
     automateList['gerrit']['to_abandon_comment'] = {}
     automateList['gerrit']['old_parent'] = {}
@@ -783,35 +1110,14 @@ def analyze_reports():
       automateList['gerrit']['to_review'][rowTmp['id']] = {'name': statList['people'][reviewEmail]['gerrit']['reviewName'],
                                                            'patchset': rowTmp['patchset'], 'id': rowTmp['id']}
 
-    for key, row in bugzillaData['bugs'].items():
-      if not 'cc' in row:
-        row['cc'] = []
-      if not 'keywords' in row:
-        row['keywords'] = []
-
-      if row['status'] == 'RESOLVED' or row['status'] == 'VERIFIED':
-        continue
-
-      if not 'easyHack' in row['keywords']:
-        if 'mentoring' in row['cc']:
-            automateList['bugzilla']['remove_cc'][key] = 0
-        continue
-
-      if 'needsDevEval' in row['keywords']:
-          statList['reportList']['needsDevEval'].append(key)
-      if 'needsUXEval' in row['keywords']:
-          statList['reportList']['needsUXEval'].append(key)
-      if row['status'] == 'NEEDINFO':
-          statList['reportList']['needinfo'].append(key)
-      if len(row['comments']) >= 5:
-        statList['reportList']['too_many_comments'].append(key)
-      if not 'mentoring@documentfoundation.org' in row['cc']:
-          automateList['bugzilla']['missing_cc'][key] = 0
-      if row['comments'][-1]['creator'] == 'libreoffice-commits@lists.freedesktop.org' and not key in cfg['bugzilla']['close_except']:
-          statList['reportList']['to_be_closed'].append(key)
-      cDate = datetime.datetime.strptime(row['creation_time'], "%Y-%m-%dT%H:%M:%SZ")
-      if cDate >= cfg['1weekDate'] or (len(row['history']) > 0 and 'easyhack' in row['history'][-1]['changes'][0]['added']):
-        statList['reportList']['easyhacks_new'].append(key)
+    # the bugzilla part is collected by the reports stage of analyze_bugzilla()
+    stage = bugScanStages.get('analyze_reports', {})
+    if stage.get('failed', True):
+      raise Exception('bugzilla scan for reports failed')
+    for i in stage['reportList']:
+      statList['reportList'][i] = stage['reportList'][i]
+    automateList['bugzilla']['missing_cc'] = stage['missing_cc']
+    automateList['bugzilla']['remove_cc'] = stage['remove_cc']
 
     tmpClist = sorted(statList['people'], key=lambda k: (statList['people'][k]['commits']['1month']['owner']),reverse=True)
     for i in tmpClist:
@@ -845,6 +1151,418 @@ def analyze_reports():
 
 
 
+def util_scan_bugs(stageList, bugList, firstIndex):
+    global bugScanIndex
+
+    for bugScanIndex, (key, row) in enumerate(bugList, firstIndex):
+      bugStages = []
+      for stage in stageList:
+        if not stage['failed']:
+          stage['seq'] = 0
+          if util_scan_call(stage, 'bug', key, row):
+            bugStages.append(stage)
+      if not bugStages:
+        continue
+
+      eventStages = [x for x in bugStages if 'comment' in x]
+      if eventStages:
+        for comment in row['comments']:
+          xDate = comment['creation_date']
+          for stage in eventStages:
+            if not stage['failed']:
+              util_scan_call(stage, 'comment', comment, xDate)
+      eventStages = [x for x in bugStages if 'history' in x]
+      if eventStages:
+        for change in row['history']:
+          xDate = change['when_date']
+          for stage in eventStages:
+            if not stage['failed']:
+              util_scan_call(stage, 'history', change, xDate)
+      for stage in bugStages:
+        if 'end' in stage and not stage['failed']:
+          util_scan_call(stage, 'end', key, row)
+
+
+
+def util_scan_start(stageList):
+    global bugScanStages, bugScanPeople, bugScanNames, bugScanTouches
+
+    bugScanStages = {}
+    bugScanPeople = {}
+    bugScanNames = {}
+    bugScanTouches = None
+    for index, stage in enumerate(stageList):
+      bugScanStages[stage['name']] = stage
+      stage['index'] = index
+      stage['seq'] = 0
+      stage['failed'] = False
+      util_scan_call(stage, 'prepare')
+
+
+
+def util_diff_counters(newList, oldList):
+    result = {}
+    for i, x in newList.items():
+      if type(x) is dict:
+        x = util_diff_counters(x, oldList.get(i, {}))
+        if x:
+          result[i] = x
+      elif type(x) is int and x != oldList.get(i, 0):
+        result[i] = x - oldList.get(i, 0)
+    return result
+
+
+
+def util_add_counters(target, diff):
+    for i, x in diff.items():
+      if type(x) is dict:
+        util_add_counters(target.setdefault(i, {}), x)
+      else:
+        target[i] = target.get(i, 0) + x
+
+
+
+def util_scan_shard(shard):
+    global statList, periodTable, bugScanStages, bugScanPeople, bugScanNames, bugScanItems
+
+    # runs in a forked process, all that changed is returned to util_scan_merge()
+    start, stop = shard
+    stageList = sorted(bugScanStages.values(), key=lambda x: x['index'])
+    oldData = copy.deepcopy(statList['data'])
+    periodTable = {'keys': {}, 'date': [], 'key': []}
+    bugScanPeople = {}
+    bugScanNames = {}
+    util_scan_bugs(stageList, bugScanItems[start:stop], start)
+    return {'data': util_diff_counters(statList['data'], oldData),
+            'period': (list(periodTable['keys']), periodTable['date'], periodTable['key']),
+            'people': bugScanPeople,
+            'names': bugScanNames,
+            'stages': [{i: x for i, x in stage.items() if not callable(x)} for stage in stageList]}
+
+
+
+def util_scan_merge(stageList, part):
+    global statList, periodTable, bugScanPeople, bugScanNames
+
+    util_add_counters(statList['data'], part['data'])
+
+    keyList, dates, keys = part['period']
+    index = []
+    for key in keyList:
+      if not key in periodTable['keys']:
+        periodTable['keys'][key] = len(periodTable['keys'])
+      index.append(periodTable['keys'][key])
+    periodTable['date'] += dates
+    periodTable['key'] += [index[x] for x in keys]
+
+    for mail, touch in part['people'].items():
+      if not mail in bugScanPeople:
+        bugScanPeople[mail] = touch
+        statList['people'][mail] = util_create_person_gerrit(touch['name'], mail)
+        if mail == '*dummy*':
+          statList['people'][mail]['licenseOK'] = True
+        continue
+      person = bugScanPeople[mail]
+      if touch['first'] < person['first']:
+        person['first'] = touch['first']
+        person['name'] = touch['name']
+      if touch['named'] is not None and (person['named'] is None or touch['named'] < person['named']):
+        person['named'] = touch['named']
+        person['realName'] = touch['realName']
+
+    for mail, x in part['names'].items():
+      if not mail in bugScanNames or x < bugScanNames[mail]:
+        bugScanNames[mail] = x
+
+    for stage, x in zip(stageList, part['stages']):
+      if x['failed']:
+        stage['failed'] = True
+      elif not stage['failed']:
+        util_scan_call(stage, 'merge', x)
+
+
+
+def util_scan_sharded(stageList, workers):
+    global statList, bugzillaData, bugScanPeople, bugScanNames, bugScanItems
+
+    # The shards are merged in order, so the result is the same as util_scan_bugs()
+    # over all bugs. The period counters are merged through the event table.
+    bugScanItems = list(bugzillaData['bugs'].items())
+    size = len(bugScanItems) // workers + 1
+    shards = [(x, x + size) for x in range(0, len(bugScanItems), size)]
+    try:
+      # a new process for each shard, so every shard starts from the state before the scan
+      # keeps the gc of the processes away from the (shared) dumps, they live until the end anyway
+      gc.freeze()
+      with multiprocessing.get_context('fork').Pool(workers, maxtasksperchild=1) as pool:
+        partList = pool.map(util_scan_shard, shards, chunksize=1)
+    except Exception as e:
+      # nothing is merged yet, so the serial scan still gives the right result
+      print("bugzilla: process pool failed with " + str(e) + ", scan in one process", flush=True)
+      partList = []
+      util_scan_bugs(stageList, bugScanItems, 0)
+    bugScanItems = None
+
+    for part in partList:
+      util_scan_merge(stageList, part)
+    for mail, (touch, name) in bugScanNames.items():
+      if not mail in bugScanPeople and statList['people'][mail]['name'] == '*UNKNOWN*':
+        statList['people'][mail]['name'] = name
+
+
+
+# With cfg['analyze']['incremental'] the stages marked with 'cache' (they walk all comments and
+# history of a bug) keep what each bug contributed in dump/analyze_state.pickle:
+#   events    the rows the bug added to the event table, counted again every run
+#   counters  what the bug added to statList['data'][stage['cache']] directly
+#   touches   per mail the first (named) util_scan_mail() call, to restore people order and names
+# Bugzilla changes last_change_time with everything the collector fetches for a bug, so a bug
+# with the same last_change_time reuses its record. Changed, new and removed bugs have their
+# old record retracted, changed and new bugs are scanned again and recorded.
+# The other stages depend on the week (or are cheap) and see every bug as before.
+bugScanStateVersion = 1
+
+def util_scan_load_state():
+    global cfg, statList
+
+    gcEnabled = gc.isenabled()
+    gc.disable()
+    try:
+      with open(cfg['homedir'] + 'dump/analyze_state.pickle', 'rb') as fp:
+        state = pickle.load(fp)
+      # the keys of the events hold aliased mails
+      if state['version'] == bugScanStateVersion and state['aliases'] == statList['aliases']:
+        return state
+    except Exception:
+      pass
+    finally:
+      if gcEnabled:
+        gc.enable()
+    # the events are kept as arrays, they pickle a lot faster than lists of datetime
+    return {'version': bugScanStateVersion, 'aliases': dict(statList['aliases']), 'bugs': {}, 'keys': {},
+            'date': numpy.array([], dtype='datetime64[us]'), 'key': numpy.array([], dtype=numpy.intp),
+            'dead': 0, 'counters': {}}
+
+
+
+def util_scan_save_state(state):
+    global cfg
+
+    # retracted events are marked with -1, drop them when they are the majority
+    if state['dead'] > len(state['key']) // 2:
+      order = [numpy.array([], dtype=numpy.intp)]
+      size = 0
+      for record in state['bugs'].values():
+        start, stop = record['events']
+        record['events'] = (size, size + stop - start)
+        order.append(numpy.arange(start, stop))
+        size += stop - start
+      order = numpy.concatenate(order)
+      state['date'] = state['date'][order]
+      state['key'] = state['key'][order]
+      state['dead'] = 0
+
+    fileName = cfg['homedir'] + 'dump/analyze_state.pickle'
+    gcEnabled = gc.isenabled()
+    gc.disable()
+    try:
+      with open(fileName + '.tmp', 'wb') as fp:
+        pickle.dump(state, fp, pickle.HIGHEST_PROTOCOL)
+      os.replace(fileName + '.tmp', fileName)
+    except Exception as e:
+      print('Error dump file ' + fileName + ' due to ' + str(e))
+      if os.path.isfile(fileName + '.tmp'):
+        os.remove(fileName + '.tmp')
+    finally:
+      if gcEnabled:
+        gc.enable()
+
+
+
+def util_scan_leaves(tree, path):
+    # the int counters below tree as (dict, name, path)
+    result = []
+    for i, x in tree.items():
+      if type(x) is dict:
+        result += util_scan_leaves(x, path + (i,))
+      elif type(x) is int:
+        result.append((tree, i, path + (i,)))
+    return result
+
+
+
+def util_scan_record(touchList):
+    # per mail: first touch with its name, first touch with a real name
+    result = {}
+    for mail, name, stageIndex, seq in touchList:
+      touch = (stageIndex, seq)
+      named = name and name != '*UNKNOWN*'
+      x = result.get(mail)
+      if x is None:
+        result[mail] = [touch, name, touch if named else None, name if named else None]
+        continue
+      if touch < x[0]:
+        x[0] = touch
+        x[1] = name
+      if named and (x[2] is None or touch < x[2]):
+        x[2] = touch
+        x[3] = name
+    return result
+
+
+
+def util_scan_retract(state, record):
+    start, stop = record['events']
+    state['key'][start:stop] = -1
+    state['dead'] += stop - start
+    for path, x in record['counters']:
+      state['counters'][path] -= x
+
+
+
+def util_scan_incremental(stageList):
+    global cfg, statList, bugzillaData, periodTable, bugScanIndex, bugScanPeople, bugScanNames, bugScanTouches
+
+    state = util_scan_load_state()
+    liveStages = [x for x in stageList if not 'cache' in x]
+    cachedStages = [x for x in stageList if 'cache' in x]
+    leaves = []
+    for stage in cachedStages:
+      leaves += util_scan_leaves(statList['data'][stage['cache']], (stage['cache'],))
+    base = [tree[i] for tree, i, path in leaves]
+    oldPeople = set(statList['people'])
+    unknownPeople = {x for x in oldPeople if statList['people'][x]['name'] == '*UNKNOWN*'}
+    first = len(periodTable['key'])
+
+    # the stages share no state, so the live stages scan all bugs in one go
+    util_scan_bugs(liveStages, bugzillaData['bugs'].items(), 0)
+
+    # bugs after cutDate are skipped by some stages, a record is only valid on the same side
+    cutDate = cfg['cutDate']
+    scanList = []
+    for bugScanIndex, (key, row) in enumerate(bugzillaData['bugs'].items()):
+      record = state['bugs'].get(key)
+      if record is not None and record['stamp'] == row['last_change_time'] and \
+         (row['last_change_date'] > record['cutDate']) == (row['last_change_date'] > cutDate):
+        continue
+
+      bugScanTouches = []
+      start = len(periodTable['key'])
+      before = [tree[i] for tree, i, path in leaves]
+      util_scan_bugs(cachedStages, [(key, row)], bugScanIndex)
+      scanList.append((key, {'stamp': row['last_change_time'],
+                             'cutDate': cutDate,
+                             'events': (start, len(periodTable['key'])),
+                             'counters': [(path, tree[i] - x) for (tree, i, path), x in zip(leaves, before) if tree[i] != x],
+                             'touches': util_scan_record(bugScanTouches)}))
+    bugScanTouches = None
+
+    # move the new records (with their events) to the state
+    keyList = list(periodTable['keys'])
+    index = [state['keys'].setdefault(x, len(state['keys'])) for x in keyList]
+    size = len(state['key'])
+    for key, record in scanList:
+      if key in state['bugs']:
+        util_scan_retract(state, state['bugs'][key])
+      start, stop = record['events']
+      record['events'] = (size + start - first, size + stop - first)
+      for path, x in record['counters']:
+        state['counters'][path] = state['counters'].get(path, 0) + x
+      state['bugs'][key] = record
+    for key in [x for x in state['bugs'] if not x in bugzillaData['bugs']]:
+      util_scan_retract(state, state['bugs'].pop(key))
+    state['date'] = numpy.concatenate([state['date'], numpy.array(periodTable['date'][first:], dtype='datetime64[us]')])
+    state['key'] = numpy.concatenate([state['key'], numpy.array([index[x] for x in periodTable['key'][first:]], dtype=numpy.intp)])
+    print("bugzilla: " + str(len(scanList)) + " bugs scanned, " + str(len(bugzillaData['bugs']) - len(scanList)) + " from " +
+          "dump/analyze_state.pickle", flush=True)
+
+    # the event table gets the events of all bugs, from the state
+    del periodTable['date'][first:]
+    del periodTable['key'][first:]
+    index = numpy.array([periodTable['keys'].setdefault(x, len(periodTable['keys'])) for x in state['keys']], dtype=numpy.intp)
+    inUse = state['key'] >= 0
+    periodTable['date'] += state['date'][inUse].astype(object).tolist()
+    periodTable['key'] += index[state['key'][inUse]].tolist()
+    for (tree, i, path), x in zip(leaves, base):
+      tree[i] = x + state['counters'].get(path, 0)
+
+    # people are rebuilt from the touches of all bugs, like util_scan_merge() does for shards
+    bugScanPeople = {}
+    bugScanNames = {}
+    for bugScanIndex, key in enumerate(bugzillaData['bugs']):
+      for mail, (touch, name, named, realName) in state['bugs'][key]['touches'].items():
+        if mail in oldPeople:
+          if named is not None and mail in unknownPeople:
+            x = ((bugScanIndex,) + named, realName)
+            if not mail in bugScanNames or x < bugScanNames[mail]:
+              bugScanNames[mail] = x
+          continue
+        touch = (touch[0], bugScanIndex, touch[1])
+        if named is not None:
+          named = (named[0], bugScanIndex, named[1])
+        person = bugScanPeople.get(mail)
+        if person is None:
+          bugScanPeople[mail] = {'first': touch, 'name': name, 'named': named, 'realName': realName}
+          continue
+        if touch < person['first']:
+          person['first'] = touch
+          person['name'] = name
+        if named is not None and (person['named'] is None or named < person['named']):
+          person['named'] = named
+          person['realName'] = realName
+    for mail, touch in bugScanPeople.items():
+      if not mail in statList['people']:
+        statList['people'][mail] = util_create_person_gerrit(touch['name'], mail)
+        if mail == '*dummy*':
+          statList['people'][mail]['licenseOK'] = True
+    for mail, (touch, name) in bugScanNames.items():
+      statList['people'][mail]['name'] = name
+
+    # a failed stage did not record everything
+    if True in [x['failed'] for x in stageList]:
+      print("bugzilla: a stage failed, dump/analyze_state.pickle is not updated", flush=True)
+    else:
+      util_scan_save_state(state)
+
+
+
+def analyze_bugzilla(withReports=True):
+    global cfg, statList, bugzillaData, periodTable
+
+    # same order as the analyze functions used to run, util_scan_mail() depends on it
+    stageList = [{'name': 'analyze_mentoring', 'prepare': easyhacks_scan_prepare, 'bug': easyhacks_scan_bug,
+                  'merge': easyhacks_scan_merge, 'finish': easyhacks_scan_finish},
+                 {'name': 'analyze_ui', 'bug': ui_scan_bug, 'comment': ui_scan_comment,
+                  'history': ui_scan_history, 'end': ui_scan_end, 'cache': 'ui'},
+                 {'name': 'analyze_qa', 'bug': qa_scan_bug, 'history': qa_scan_history, 'cache': 'qa'},
+                 {'name': 'analyze_esc', 'prepare': esc_scan_prepare, 'bug': esc_scan_bug,
+                  'history': esc_scan_history, 'end': esc_scan_end, 'merge': esc_scan_merge,
+                  'finish': esc_scan_finish}]
+    if withReports:
+      stageList.append({'name': 'analyze_reports', 'prepare': reports_scan_prepare, 'bug': reports_scan_bug,
+                        'merge': reports_scan_merge})
+
+    util_scan_start(stageList)
+
+    # with cfg['analyze']['workers'] > 1 shards run in a process pool, that needs the event table
+    workers = cfg.get('analyze', {}).get('workers', 1)
+    if cfg.get('analyze', {}).get('incremental', False) and periodTable is not None:
+      print("bugzilla: incremental scan for " + ', '.join(x['name'] for x in stageList), flush=True)
+      util_scan_incremental(stageList)
+    elif workers > 1 and periodTable is not None:
+      print("bugzilla: scan in " + str(workers) + " processes for " + ', '.join(x['name'] for x in stageList), flush=True)
+      util_scan_sharded(stageList, workers)
+    else:
+      print("bugzilla: scan for " + ', '.join(x['name'] for x in stageList), flush=True)
+      util_scan_bugs(stageList, bugzillaData['bugs'].items(), 0)
+
+    util_scan_people()
+    for stage in stageList:
+      if not stage['failed']:
+        util_scan_call(stage, 'finish')
+
+
+
 def analyze_myfunc():
     global cfg, statList, openhubData, bugzillaData, gerritData, gitData, licenceCompanyData, licencePersonalData
 
@@ -892,7 +1610,7 @@ def analyze_final():
 
 #    analyze_trend()
     myDay = cfg['nowDate']
-    statList['diff'] = util_build_diff(statList['data'], weekList['data'])
+    statList['diff'] = util_build_diff(statList['data'], util_load_week()['data'], diffList)
     sFile = cfg['homedir'] + 'stats.json'
     util_dump_file(sFile, statList)
     x = myDay.strftime('%Y-%m-%d')
@@ -903,6 +1621,7 @@ def analyze_final():
       with gzip.open(sArchiveFile + '.gz', 'wb') as f_out:
         f_out.writelines(f_in)
     os.remove(sArchiveFile)
+    common.util_stats_store(cfg['homedir'] + 'stats.sqlite', 'stats_' + x, statList['data'])
 
     if myDay.strftime('%w') == '4':
       if 'people' in statList:
@@ -914,6 +1633,7 @@ def analyze_final():
       if 'reportList' in statList:
         del statList['reportList']
       util_dump_file(cfg['homedir'] + 'weeks/week_' + myDay.strftime('%Y_%W') + '.json', statList)
+      common.util_stats_store(cfg['homedir'] + 'stats.sqlite', 'week_' + myDay.strftime('%Y_%W'), statList['data'])
 
 
 
@@ -923,6 +1643,7 @@ def runLoadCSV():
     try:
       fileName = cfg['homedir'] + 'gitdm-config/aliases'
       statList['aliases'] = util_load_csv(fileName, ' ')
+      util_clear_mail_cache()
       fileName = cfg['homedir'] + 'gitdm-config/licenseCompany.csv'
       cfg['companies'] = util_load_csv(fileName, ';')
       fileName = cfg['homedir'] + 'gitdm-config/licensePersonal.csv'
@@ -957,7 +1678,7 @@ def loadCfg(platform):
     else:
       homeDir = '/home/esc-mentoring/esc'
 
-    cfg = util_load_data_file(homeDir + '/config.json')
+    cfg = util_load_data_file(homeDir + '/config.json', useSnapshot=False)
     cfg['homedir'] = homeDir + '/'
 
 
@@ -975,108 +1696,251 @@ def loadCfg(platform):
 def runAnalyze():
     global cfg, statList
     global openhubData, bugzillaData, bugzillaESCData, gerritData, gitData, crashData, weekList, automateData, committersNames
+    global bugScanStages, periodTable
+    bugScanStages = {}
+    periodTable = None
+    common.util_profile_start(cfg, 'esc-analyze')
 
+    # last week's stats are loaded by util_load_week() when needed
     weekList = None
-    x = (cfg['nowDate'] - datetime.timedelta(days=7)).strftime('%Y-%m-%d')
-    gzFilePath = cfg['homedir'] + 'archive/stats_' + x + '.json.gz'
-    if os.path.isfile(gzFilePath):
-      fp = gzip.open(gzFilePath)
-      content = fp.read()
-      fp.close()
-      if content:
-        weekList = json.loads(content.decode('utf-8'))
 
-    if not weekList:
-      weekList = util_create_statList()
-
-    openhubData = util_load_data_file(cfg['homedir'] + 'dump/openhub_dump.json')
-    bugzillaData = util_load_data_file(cfg['homedir'] + 'dump/bugzilla_dump.json')
-    bugzillaESCData = util_load_data_file(cfg['homedir'] + 'dump/bugzilla_esc_dump.json')
-    gerritData = util_load_data_file(cfg['homedir'] + 'dump/gerrit_dump.json')
-    gitData = util_load_data_file(cfg['homedir'] + 'dump/git_dump.json')
-    crashData = util_load_data_file(cfg['homedir'] + 'dump/crash_dump.json')
-    automateData = util_load_data_file(cfg['homedir'] + 'dump/automate.json')
+    openhubData = util_profile_load('openhub_dump.json')
+    # cfg['analyze']['compact'] keeps comments and history as records, see common.util_compact_bugs()
+    bugzillaData = util_profile_load('bugzilla_dump.json', cfg.get('analyze', {}).get('compact', False))
+    bugzillaESCData = util_profile_load('bugzilla_esc_dump.json')
+    gerritData = util_profile_load('gerrit_dump.json')
+    gitData = util_profile_load('git_dump.json')
+    crashData = util_profile_load('crash_dump.json')
+    automateData = util_profile_load('automate.json')
     statList = util_create_statList()
     committersNames = []
     try:
-      runLoadCSV()
+      common.util_profile_call('runLoadCSV', runLoadCSV)
     except Exception as e:
       common.util_errorMail(cfg, 'esc-analyze', 'ERROR: runLoadCSV failed with ' + str(e))
       pass
+    util_start_period_table()
     try:
-      analyze_mentoring()
+      common.util_profile_call('analyze_mentoring', analyze_mentoring,
+                               count=lambda x: {'patch': len(gerritData['patch']), 'commits': len(gitData['commits'])})
     except Exception as e:
       common.util_errorMail(cfg, 'esc-analyze', 'ERROR: analyze_mentoring failed with ' + str(e))
       pass
     try:
-      analyze_ui()
-    except Exception as e:
-      common.util_errorMail(cfg, 'esc-analyze', 'ERROR: analyze_ui failed with ' + str(e))
-      pass
-    try:
-      analyze_qa()
+      common.util_profile_call('analyze_bugzilla', analyze_bugzilla,
+                               count=lambda x: {'bugs': len(bugzillaData['bugs'])})
     except Exception as e:
-      common.util_errorMail(cfg, 'esc-analyze', 'ERROR: analyze_qa failed with ' + str(e))
+      common.util_errorMail(cfg, 'esc-analyze', 'ERROR: analyze_bugzilla failed with ' + str(e))
       pass
     try:
-      analyze_esc()
+      common.util_profile_call('analyze_myfunc', analyze_myfunc)
     except Exception as e:
-      common.util_errorMail(cfg, 'esc-analyze', 'ERROR: analyze_esc failed with ' + str(e))
+      common.util_errorMail(cfg, 'esc-analyze', 'ERROR: analyze_myfunc failed with ' + str(e))
       pass
     try:
-      analyze_myfunc()
+      common.util_profile_call('util_flush_period_stat', util_flush_period_stat)
     except Exception as e:
-      common.util_errorMail(cfg, 'esc-analyze', 'ERROR: analyze_myfunc failed with ' + str(e))
+      common.util_errorMail(cfg, 'esc-analyze', 'ERROR: util_flush_period_stat failed with ' + str(e))
       pass
     try:
-      analyze_reports()
+      common.util_profile_call('analyze_reports', analyze_reports)
     except Exception as e:
       common.util_errorMail(cfg, 'esc-analyze', 'ERROR: analyze_reports failed with ' + str(e))
       pass
     try:
-      analyze_final()
+      common.util_profile_call('analyze_final', analyze_final)
     except Exception as e:
       common.util_errorMail(cfg, 'esc-analyze', 'ERROR: analyze_final failed with ' + str(e))
       pass
 
+    x = util_normalize_mail.cache_info()
+    print('mail cache: ' + str(x.hits) + ' hits, ' + str(x.misses) + ' misses, ' + str(x.currsize) + ' entries')
+    common.util_profile_finish()
+
+
+# runUpgrade() rebuilds weeks/week_YYYY_NN.json for a list of past weeks. Instead of a
+# full analyze per week, everything is analyzed once (up to the last week) and each event
+# is kept with the first week it belongs to (the date checked against cutDate):
+#   period counters    in the event table with a 'cut' column, counted per week
+#   other counters     bugs are scanned sorted by last change, statList['data'] is copied
+#                      at the end of every week
+# Weeks are then independent and can be counted in parallel (cfg['analyze']['workers']).
+def backfill_scan_bug(stage, key, row):
+    global periodCut
+
+    # first stage of the backfill scans, sets the cut for the events of the bug
+    if 'cut' in stage:
+      periodCut = stage['cut']
+    else:
+      periodCut = row['last_change_date']
+    return False
+
+
+
+def backfill_commit_types():
+    global cfg, gerritData, gitData, periodTable
+
+    # analyze_mentoring() counts a commit as committer commit when the author is a gerrit
+    # committer, committed it, or was committer of an earlier commit in the dump. For an
+    # older week only the earlier commits up to that week count, so every commit event
+    # gets the oldest date from which on it is a committer commit.
+    committers = set(util_normalize_mail(x['email']) for x in gerritData['committers'])
+    since = {}
+    typeCut = []
+    for key, row in gitData['commits'].items():
+      xDate = datetime.datetime.strptime(row['date'], "%Y-%m-%d %H:%M:%S")
+      if xDate > cfg['cutDate']:
+        continue
+      author = util_normalize_mail(row['author-email'])
+      committer = util_normalize_mail(row['committer-email'])
+      if author == committer or author in committers:
+        typeCut.append(datetime.datetime.min)
+      else:
+        typeCut.append(since.get(author, datetime.datetime.max))
+      if not committer in since or xDate < since[committer]:
+        since[committer] = xDate
+
+    # the owner events of the commits are in the same order in the event table
+    keyList = list(periodTable['keys'])
+    alt = list(range(len(keyList)))
+    for index, (email, base, peopleTarget, xType, dataTarget) in enumerate(keyList):
+      if base == 'commits' and dataTarget == 'owner' and xType == 'committer':
+        key = (email, base, peopleTarget, 'contributor', dataTarget)
+        if not key in periodTable['keys']:
+          periodTable['keys'][key] = len(periodTable['keys'])
+        alt[index] = periodTable['keys'][key]
+    eventTypeCut = []
+    eventAlt = []
+    commitEvents = iter(typeCut)
+    for index in periodTable['key']:
+      email, base, peopleTarget, xType, dataTarget = keyList[index]
+      if base == 'commits' and dataTarget == 'owner':
+        eventTypeCut.append(next(commitEvents))
+      else:
+        eventTypeCut.append(datetime.datetime.min)
+      eventAlt.append(alt[index])
+    if next(commitEvents, None) is not None:
+      raise Exception('commit events do not match git dump')
+    return eventTypeCut, eventAlt
+
+
+
+def backfill_week(index):
+    global backfillTable
+
+    day = backfillTable['weeks'][index]
+    periodDates = {'1week': day - datetime.timedelta(days=7),
+                   '1month': day - datetime.timedelta(days=30),
+                   '3month': day - datetime.timedelta(days=90),
+                   '1year': day - datetime.timedelta(days=365)}
+    cnt = bisect.bisect_right(backfillTable['cut'], day)
+    # commit events before the author was committer that week count as contributor
+    keys = numpy.where(backfillTable['typeCut'][:cnt] > day, backfillTable['alt'][:cnt], backfillTable['key'][:cnt])
+    counts = util_count_period_table(backfillTable['date'][:cnt], keys, len(backfillTable['keyList']), periodDates)
+    data = copy.deepcopy(backfillTable['data'][index])
+    util_add_period_counts(backfillTable['keyList'], counts, None, data)
+    return data
+
+
 
 def runUpgrade(args):
     global cfg, statList, openhubData, bugzillaData, bugzillaESCData, gerritData, gitData, crashData, weekList
+    global committersNames, periodTable, periodCut, backfillTable
 
     args = args[1:]
+    if numpy is None:
+      print('Error runUpgrade needs numpy')
+      exit(-1)
     openhubData = util_load_data_file(cfg['homedir'] + 'dump/openhub_dump.json')
-    bugzillaData = util_load_data_file(cfg['homedir'] + 'dump/bugzilla_dump.json')
+    bugzillaData = util_load_data_file(cfg['homedir'] + 'dump/bugzilla_dump.json',
+                                       compact=cfg.get('analyze', {}).get('compact', False))
     bugzillaESCData = util_load_data_file(cfg['homedir'] + 'dump/bugzilla_esc_dump.json')
     gerritData = util_load_data_file(cfg['homedir'] + 'dump/gerrit_dump.json')
     gitData = util_load_data_file(cfg['homedir'] + 'dump/git_dump.json')
     crashData = util_load_data_file(cfg['homedir'] + 'dump/crash_dump.json')
     statList = util_create_statList()
+    committersNames = []
     runLoadCSV()
-    csvList = statList
-    cfg['cutDate'] = datetime.datetime(day=27,month=8,year=2015)
-    weekList = util_create_statList()
 
-    for week in args:
-      print('upgrading ' + week)
+    # the weeks end on the thursdays after 2015-08-27, analyze once up to the last one
+    weeks = [datetime.datetime(day=27,month=8,year=2015) + datetime.timedelta(days=7 * (i + 1)) for i in range(len(args))]
+    if not weeks:
+      return
+    cfg['cutDate'] = weeks[-1]
+    cfg['nowDate'] = cfg['cutDate']
+    cfg['1weekDate'] = cfg['nowDate'] - datetime.timedelta(days=7)
+    cfg['1monthDate'] = cfg['nowDate'] - datetime.timedelta(days=30)
+    cfg['3monthDate'] = cfg['nowDate'] - datetime.timedelta(days=90)
+    cfg['1yearDate'] = cfg['nowDate'] - datetime.timedelta(days=365)
 
-      # create new statlist
-      cfg['cutDate'] += datetime.timedelta(days=7)
-      cfg['nowDate'] = cfg['cutDate']
-      cfg['1weekDate'] = cfg['nowDate'] - datetime.timedelta(days=7)
-      cfg['1monthDate'] = cfg['nowDate'] - datetime.timedelta(days=30)
-      cfg['3monthDate'] = cfg['nowDate'] - datetime.timedelta(days=90)
-      cfg['1yearDate'] = cfg['nowDate'] - datetime.timedelta(days=365)
+    periodTable = {'keys': {}, 'date': [], 'key': [], 'cut': []}
+    periodCut = None
+    analyze_mentoring()
+
+    # qa does not look at cutDate, its events count in every week
+    stageList = [{'name': 'backfill', 'bug': backfill_scan_bug, 'cut': datetime.datetime.min},
+                 {'name': 'analyze_qa', 'bug': qa_scan_bug, 'history': qa_scan_history}]
+    util_scan_start(stageList)
+    util_scan_bugs(stageList, bugzillaData['bugs'].items(), 0)
+
+    stageList = [{'name': 'backfill', 'bug': backfill_scan_bug},
+                 {'name': 'analyze_mentoring', 'prepare': easyhacks_scan_prepare, 'bug': easyhacks_scan_bug,
+                  'finish': easyhacks_scan_finish},
+                 {'name': 'analyze_ui', 'bug': ui_scan_bug, 'comment': ui_scan_comment,
+                  'history': ui_scan_history, 'end': ui_scan_end}]
+    util_scan_start(stageList)
+    bugList = sorted(bugzillaData['bugs'].items(), key=lambda x: x[1]['last_change_date'])
+    bugDates = [x[1]['last_change_date'] for x in bugList]
+    dataList = []
+    start = 0
+    for day in weeks:
+      stop = bisect.bisect_right(bugDates, day)
+      util_scan_bugs(stageList, bugList[start:stop], start)
+      start = stop
+      dataList.append(copy.deepcopy(statList['data']))
+    for stage in stageList:
+      if not stage['failed']:
+        util_scan_call(stage, 'finish')
+
+    # sort the events by cut, a week is then a prefix of the table
+    typeCut, alt = backfill_commit_types()
+    cut = numpy.array(periodTable['cut'], dtype=object)
+    order = numpy.argsort(cut, kind='stable')
+    backfillTable = {'weeks': weeks,
+                     'data': dataList,
+                     'keyList': list(periodTable['keys']),
+                     'cut': cut[order].tolist(),
+                     'date': numpy.array(periodTable['date'], dtype=object)[order],
+                     'key': numpy.array(periodTable['key'], dtype=numpy.intp)[order],
+                     'typeCut': numpy.array(typeCut, dtype=object)[order],
+                     'alt': numpy.array(alt, dtype=numpy.intp)[order]}
+    periodTable = None
+
+    workers = cfg.get('analyze', {}).get('workers', 1)
+    if workers > 1:
+      with multiprocessing.get_context('fork').Pool(workers) as pool:
+        dataList = pool.map(backfill_week, range(len(weeks)))
+    else:
+      dataList = [backfill_week(x) for x in range(len(weeks))]
 
+    # the esc numbers use the week before, so the weeks are finished in order
+    stat = statList['stat']
+    weekList = util_create_statList()
+    for week, day, data in zip(args, weeks, dataList):
+      print('upgrading ' + week)
       statList = util_create_statList()
-      statList['aliases'] = csvList['aliases']
-      analyze_mentoring()
-      analyze_ui()
-      analyze_qa()
-      analyze_esc()
-      analyze_myfunc()
-
-      analyze_final()
+      statList['data'] = data
+      statList['stat'] = copy.deepcopy(stat)
+      stage = {'name': 'analyze_esc', 'prepare': esc_scan_prepare, 'finish': esc_scan_finish}
+      util_scan_start([stage])
+      if not stage['failed']:
+        util_scan_call(stage, 'finish')
+      statList['addDate'] = datetime.date.today().strftime('%Y-%m-%d')
+      statList['diff'] = util_build_diff(statList['data'], weekList['data'], diffList)
       weekList = statList
+      util_dump_file(cfg['homedir'] + 'weeks/week_' + day.strftime('%Y_%W') + '.json',
+                     {x: statList[x] for x in ('data', 'stat', 'addDate', 'diff')})
+      common.util_stats_store(cfg['homedir'] + 'stats.sqlite', 'week_' + day.strftime('%Y_%W'), statList['data'])
 
 
 if __name__ == '__main__':
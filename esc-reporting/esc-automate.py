@@ -25,7 +25,6 @@ import sys
 import os
 import datetime
 import json
-import requests
 from requests.auth import HTTPDigestAuth
 from shlex import quote
 from subprocess import check_call
@@ -44,13 +43,16 @@ def util_load_data_file(fileName):
 
 
 def util_dump_file(fileName, rawList):
+    # write to a temporary file and rename it, so the old dump stays intact if we fail or get killed
     try:
-      fp = open(fileName, 'w', encoding='utf-8')
+      fp = open(fileName + '.tmp', 'w', encoding='utf-8')
       json.dump(rawList, fp, ensure_ascii=False, indent=4, sort_keys=True)
       fp.close()
+      os.replace(fileName + '.tmp', fileName)
     except Exception as e:
       print('Error dump file ' + fileName + ' due to ' + str(e))
-      os.remove(fileName)
+      if os.path.isfile(fileName + '.tmp'):
+        os.remove(fileName + '.tmp')
       exit(-1)
 
 
@@ -65,9 +67,9 @@ def doBugzilla(id, command, isComment=False):
     url = 'https://bugs.documentfoundation.org/rest/bug/' + id + comment + '?api_key=' + cfg['bugzilla']['api-key']
     try:
       if isComment:
-        r = requests.post(url, command)
+        r = common.util_http_request('POST', url, data=command)
       else:
-        r = requests.put(url, command)
+        r = common.util_http_request('PUT', url, data=command)
       rawData = json.loads(r.text)
       r.close()
     except Exception as e:
@@ -150,12 +152,18 @@ def handle_mail_miss_you(email, name):
 
 
 
+def executeItems(func, itemList):
+    for id, val in itemList.items():
+      func(id, val)
+
+
+
 def executeLoop(func, xType, xName):
     global autoList
 
     try:
-      for id, val in autoList[xType][xName].items():
-        func(id, val)
+      common.util_profile_call(func.__name__, executeItems, func, autoList[xType][xName],
+                               count={'items': len(autoList[xType][xName])})
     except Exception as e:
       common.util_errorMail(cfg, 'esc-automate', 'ERROR: ' + str(func) + ' failed with ' + str(e))
       return
@@ -176,6 +184,7 @@ def runCfg(platform):
     cfg = util_load_data_file(homeDir + '/config.json')
     cfg['homedir'] = homeDir + '/'
     cfg['platform'] = platform
+    common.util_http_setup(cfg)
     print("Reading and writing data to " + cfg['homedir'])
 
     cfg['nowDate'] = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
@@ -191,7 +200,7 @@ def runCfg(platform):
 def runAutomate():
     global cfg, autoList, mail_pdf_index, pdfFieldData
 
-
+    common.util_profile_start(cfg, 'esc-automate')
     automateFile = cfg['homedir'] + 'automateTODO.json'
     autoList = util_load_data_file(automateFile)
     fp = open(cfg['homedir'] + 'AckFields.fdf', 'rb')
@@ -206,6 +215,7 @@ def runAutomate():
     executeLoop(handle_mail_pdf, 'mail', 'award_1st_email')
 
     util_dump_file(automateFile, autoList)
+    common.util_profile_finish()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+#
+# This file is part of the LibreOffice project.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+#
+
+
+
+### DESCRIPTION
+#
+# This program times the analysis of esc-reporting and qa on the dumps in esc/,
+# normally made by esc-generate.py, and appends the results as one JSON line to
+#     esc/benchmark.jsonl
+# so runs before and after a change (or of different nights) can be compared.
+#
+# esc-benchmark.py [--runs 3] [--only esc-analyze,qa-checkers] [--compact]
+#
+# Every benchmark runs in its own python process, esc-reporting and qa both have
+# a common.py and the scripts keep their state in module globals. The dumps are
+# loaded once before the timed runs, so the pickle snapshots exist and 'load'
+# is the time to read them. The qa reports write to /tmp like the scripts do,
+# qa-weekly-report is not run by default as it asks tinyurl for short links.
+#
+# Nothing is mailed, a failing esc-analyze stage fails its benchmark.
+#
+
+
+
+import sys
+import os
+import time
+import json
+import argparse
+import datetime
+import importlib.util
+import platform
+import subprocess
+import tempfile
+
+escDir = os.path.dirname(os.path.abspath(__file__)) + '/'
+qaDir = os.path.dirname(escDir[:-1]) + '/qa/'
+defaultList = ['esc-analyze', 'qa-checkers', 'qa-data', 'qa-weekly', 'qa-blog', 'qa-crashes']
+
+
+
+def util_import(dirName, name):
+    sys.path.insert(0, dirName)
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), dirName + name + '.py')
+    module = importlib.util.module_from_spec(spec)
+    # the scripts import common themselves and have to get this module
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+
+def util_qa_setup():
+    # qa/common.py has the paths of vm174 hardcoded
+    common = util_import(qaDir, 'common')
+    common.dataDir = cfg['homedir'] + 'dump/'
+    common.configDir = cfg['homedir']
+    common.compactBugzilla = cfg['compact']
+    return common
+
+
+
+def util_qa_period():
+    # the arguments of util_parse_date_args(): the last year
+    return argparse.Namespace(Date=[cfg['nowDate'] - datetime.timedelta(days=365), cfg['nowDate']])
+
+
+
+def util_timed(result, name, func, *args):
+    start = time.perf_counter()
+    x = func(*args)
+    result[name] = round(time.perf_counter() - start, 3)
+    return x
+
+
+
+def bench_esc_analyze(result):
+    analyze = util_import(escDir, 'esc-analyze')
+    errors = []
+    analyze.common.util_errorMail = lambda cfg, fileName, text: errors.append(text)
+    analyze.loadCfg(sys.platform)
+    if cfg['compact']:
+      analyze.cfg.setdefault('analyze', {})['compact'] = True
+    util_timed(result, 'run', analyze.runAnalyze)
+    if errors:
+      raise Exception('; '.join(errors))
+
+    # the stages of the run from esc-analyze's own profile
+    with open(cfg['homedir'] + 'dump/profile.jsonl', encoding='utf-8') as fp:
+      run = json.loads(fp.readlines()[-1])
+    result['stages'] = {x['stage']: x['wall'] for x in run['stages']}
+
+
+
+def bench_qa_checkers(result):
+    common = util_qa_setup()
+    checker = util_import(qaDir, 'bugzillaChecker')
+    bugzillaData = util_timed(result, 'load', common.get_bugzilla)
+    cfg = checker.runCfg()
+    statList = checker.util_create_statList_checkers()
+    util_timed(result, 'run', checker.analyze_bugzilla_checkers, statList, bugzillaData, cfg)
+
+
+
+def bench_qa_data(result):
+    common = util_qa_setup()
+    analyzer = util_import(qaDir, 'bugzillaDataAnalyzer')
+    bugzillaData = util_timed(result, 'load', common.get_bugzilla)
+    # like __main__ of the script, analyze_bugzilla_data() also uses the global args
+    analyzer.args = util_qa_period()
+    statList = analyzer.util_create_statList()
+    util_timed(result, 'run', analyzer.analyze_bugzilla_data, statList, bugzillaData, analyzer.args)
+    util_timed(result, 'report', analyzer.data_Report, statList)
+
+
+
+def bench_qa_weekly(result, withReport=False):
+    common = util_qa_setup()
+    weekly = util_import(qaDir, 'createWeeklyReport')
+    bugzillaData = util_timed(result, 'load', common.get_bugzilla)
+    weekly.cfg = weekly.runCfg()
+    statList = weekly.util_create_statList_weeklyReport()
+    util_timed(result, 'run', weekly.analyze_bugzilla_weeklyReport, statList, bugzillaData, weekly.cfg)
+    if withReport:
+      util_timed(result, 'report', weekly.create_weekly_Report, statList)
+
+
+
+def bench_qa_blog(result):
+    common = util_qa_setup()
+    blog = util_import(qaDir, 'createBlogReport')
+    bugzillaData = util_timed(result, 'load', common.get_bugzilla)
+    # like __main__ of the script, the report functions use the global statList
+    blog.statList = blog.util_create_statList()
+    statList = blog.statList
+    util_timed(result, 'run', blog.analyze_bugzilla_data, statList, bugzillaData, util_qa_period())
+    util_timed(result, 'report', blog.createReport, statList)
+
+
+
+def bench_qa_crashes(result):
+    # streams the dump with common.iter_bugzilla(), there is no separate load
+    common = util_qa_setup()
+    crashes = util_import(qaDir, 'createCrashesList')
+    statList = crashes.util_create_statList_crashes()
+    bugList = common.iter_bugzilla(['id', 'summary', 'component', 'status', 'resolution', 'cf_crashreport'])
+    util_timed(result, 'run', crashes.analyze_bugzilla_checkers, statList, bugList)
+
+
+
+def bench_load(result):
+    util_timed(result, 'run', util_qa_setup().get_bugzilla)
+
+
+
+benchList = {'load': bench_load,
+             'esc-analyze': bench_esc_analyze,
+             'qa-checkers': bench_qa_checkers,
+             'qa-data': bench_qa_data,
+             'qa-weekly': bench_qa_weekly,
+             'qa-weekly-report': lambda result: bench_qa_weekly(result, withReport=True),
+             'qa-blog': bench_qa_blog,
+             'qa-crashes': bench_qa_crashes}
+
+
+
+def runChild(name, resultFile):
+    # runs one benchmark in this process, the result goes to resultFile
+    result = {'status': 'ok'}
+    try:
+      benchList[name](result)
+    except Exception as e:
+      result['status'] = 'failed'
+      result['error'] = str(e)
+    try:
+      import resource
+      x = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+      result['maxrss'] = x if sys.platform == 'darwin' else x * 1024
+    except ImportError:
+      pass
+    with open(resultFile, 'w', encoding='utf-8') as fp:
+      json.dump(result, fp)
+
+
+
+def util_run_child(name, quiet):
+    fd, resultFile = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+      subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name, resultFile] + (['--compact'] if cfg['compact'] else []),
+                     stdout=subprocess.DEVNULL if quiet else None)
+      with open(resultFile, encoding='utf-8') as fp:
+        return json.load(fp)
+    except ValueError:
+      return {'status': 'failed', 'error': 'no result'}
+    finally:
+      os.remove(resultFile)
+
+
+
+def util_dump_info():
+    info = {}
+    fileName = cfg['homedir'] + 'dump/bugzilla_dump.json'
+    if os.path.isfile(fileName):
+      info['bugzilla_dump.json'] = os.path.getsize(fileName)
+    try:
+      info['revision'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=escDir,
+                                        capture_output=True, text=True).stdout.strip()
+    except OSError:
+      pass
+    return info
+
+
+
+def runBenchmark(args):
+    nameList = args.only.split(',') if args.only else defaultList
+    for name in nameList:
+      if name not in benchList:
+        print('Unknown benchmark ' + name + ', known are ' + ', '.join(benchList))
+        exit(-1)
+
+    # the checkers add people to the ignore lists of configQA.json, every run starts from the same one
+    configFile = cfg['homedir'] + 'configQA.json'
+    configQA = None
+    if os.path.isfile(configFile):
+      with open(configFile, encoding='utf-8') as fp:
+        configQA = fp.read()
+
+    run = {'date': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+           'python': platform.python_version(),
+           'runs': args.runs,
+           'compact': cfg['compact'],
+           'benchmarks': {}}
+    run.update(util_dump_info())
+
+    print('Creating snapshots')
+    util_run_child('load', True)
+    for name in nameList:
+      resultList = []
+      for i in range(args.runs):
+        if configQA is not None:
+          with open(configFile, 'w', encoding='utf-8') as fp:
+            fp.write(configQA)
+        result = util_run_child(name, not args.verbose)
+        resultList.append(result)
+        print('%s run %d: %s %s' % (name, i + 1, result['status'], result.get('run', result.get('error'))))
+      bench = {'status': 'ok' if all(x['status'] == 'ok' for x in resultList) else 'failed', 'results': resultList}
+      if bench['status'] == 'ok':
+        bench['best'] = min(x['run'] for x in resultList)
+      run['benchmarks'][name] = bench
+    if configQA is not None:
+      with open(configFile, 'w', encoding='utf-8') as fp:
+        fp.write(configQA)
+
+    fileName = args.output or cfg['homedir'] + 'benchmark.jsonl'
+    with open(fileName, 'a', encoding='utf-8') as fp:
+      print(json.dumps(run), file=fp)
+    print('Results appended to ' + fileName)
+
+
+
+def loadCfg():
+    global cfg
+
+    if 'esc_homedir' in os.environ:
+      homeDir = os.environ['esc_homedir']
+    else:
+      homeDir = '/home/esc-mentoring/esc'
+
+    cfg = {'homedir': homeDir + '/',
+           'nowDate': datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0),
+           'compact': '--compact' in sys.argv}
+
+
+
+if __name__ == '__main__':
+    loadCfg()
+    if len(sys.argv) >= 4 and sys.argv[1] == '--child':
+      runChild(sys.argv[2], sys.argv[3])
+      exit(0)
+
+    parser = argparse.ArgumentParser(description='time esc-analyze and the qa scripts on the dumps in $esc_homedir')
+    parser.add_argument('--runs', type=int, default=3, help='runs of every benchmark (default 3)')
+    parser.add_argument('--only', help='comma separated benchmarks, of ' + ', '.join(benchList))
+    parser.add_argument('--output', help='file the results are appended to (default $esc_homedir/benchmark.jsonl)')
+    parser.add_argument('--verbose', action='store_true', help='show the output of the scripts')
+    parser.add_argument('--compact', action='store_true', help='load bugzilla as compact records (common.util_compact_bugs())')
+    runBenchmark(parser.parse_args())
@@ -18,6 +18,8 @@
 #
 # The data is dumped to json files, with a history of minimum 1 year
 #     esc/dump/['openhub','bugzilla','gerrit','git']_dump.json
+# bugzilla changes are appended to esc/dump/bugzilla_dump.json.segments/ and only merged
+# into bugzilla_dump.json once in a while, use common.util_load_dump() to read it.
 #
 # The JSON is a 1-1 copy of the data in the systems
 # This program should only be changed when one of systems is updated.
@@ -36,9 +38,11 @@ import os
 import operator
 import datetime
 import json
+import threading
+import time
 import xmltodict
-import requests
-from subprocess import check_call, Popen, DEVNULL, PIPE, CalledProcessError
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import call, check_call, Popen, DEVNULL, PIPE, CalledProcessError
 from requests.auth import HTTPDigestAuth
 
 
@@ -56,48 +60,57 @@ def util_load_file(fileName):
 
 
 
-def util_load_url(url, useDict=False, useRaw=False, useSkipJSON=False, uUser=None, uPass=None):
+def util_load_url(url, useDict=False, useRaw=False, useSkipJSON=False, uUser=None, uPass=None, useCache=False):
     try:
-      if uUser is None:
-        r = requests.get(url)
+      if useCache:
+        # revalidated with ETag/Last-Modified, see common.util_http_cached()
+        text = common.util_http_cached(url)
       else:
-        r = requests.get(url, auth=HTTPDigestAuth(uUser, uPass))
-        useSkipJSON = True
+        if uUser is None:
+          r = common.util_http_request('GET', url)
+        else:
+          r = common.util_http_request('GET', url, auth=HTTPDigestAuth(uUser, uPass))
+          useSkipJSON = True
+        r.raise_for_status()
+        text = r.text
+        r.close()
 
       if useDict:
         try:
-          rawData = xmltodict.parse(x)
+          rawData = xmltodict.parse(text)
         except Exception as e:
           rawData = {'response': {'result': {'project': {},
                                     'contributor_fact': {}}}}
       elif useRaw:
-        rawData = r.text
+        rawData = text
       elif useSkipJSON:
-        rawData = json.loads(r.text[5:])
+        rawData = json.loads(text[5:])
       else:
-        rawData = r.json()
-      r.close()
+        rawData = json.loads(text)
     except Exception as e:
-      print('Error load url ' + url + ' due to ' + str(e))
-      exit(-1)
+      # retries are done by the session, so this is not a transient error,
+      # let the caller (runBuild) report it and continue with the next source
+      raise Exception('Error load url ' + url + ' due to ' + str(e))
     return rawData
 
 
 
 def util_dump_file(fileName, rawList):
+    # write to a temporary file and rename it, so the old dump stays intact if we fail or get killed
     try:
-      fp = open(fileName, 'w', encoding='utf-8')
+      fp = open(fileName + '.tmp', 'w', encoding='utf-8')
       json.dump(rawList, fp, ensure_ascii=False, indent=4, sort_keys=True)
       fp.close()
+      os.replace(fileName + '.tmp', fileName)
     except Exception as e:
-      print('Error dump file ' + fileName + ' due to ' + str(e))
-      os.remove(fileName)
-      exit(-1)
+      if os.path.isfile(fileName + '.tmp'):
+        os.remove(fileName + '.tmp')
+      raise Exception('Error dump file ' + fileName + ' due to ' + str(e))
 
 
 
 def util_load_data_file(cfg, fileName, funcName, rawListProto):
-    rawList = util_load_file(fileName)
+    rawList = common.util_load_dump(fileName)
     if rawList == None:
       rawList = rawListProto
       rawList['newest-entry'] = (datetime.datetime.now() - datetime.timedelta(days=365)).strftime("%Y-%m-%d 00")
@@ -107,85 +120,160 @@ def util_load_data_file(cfg, fileName, funcName, rawListProto):
 
 
 
+def util_open_journal(fileName, searchDate, funcName):
+    # an existing journal means the last run was interrupted, continue it with its search date
+    journalName = fileName + '.journal'
+    journal = common.util_journal_load(journalName)
+    if journal:
+      searchDate = datetime.datetime.strptime(journal[0]['search'], "%Y-%m-%d %H:%M:%S")
+      print('resuming interrupted ' + funcName + ' run, ' + str(len(journal) - 1) + ' steps already done')
+    else:
+      common.util_journal_append(journalName, {'search': searchDate.strftime("%Y-%m-%d %H:%M:%S")})
+    return journalName, searchDate, journal[1:]
+
+
+
 def get_openhub(cfg):
     fileName = cfg['homedir'] + 'dump/openhub_dump.json'
     searchDate, rawList = util_load_data_file(cfg, fileName, 'openhub', {'project': {}, 'people': {}})
+    journalName, searchDate, journal = util_open_journal(fileName, searchDate, 'openhub')
     newDate = searchDate
     print("Updating openHub dump from " + rawList['newest-entry'])
 
     urlBase = 'https://www.openhub.net/p/libreoffice'
     url = urlBase + '.xml?api_key=' + cfg['openhub']['api-key']
-    rawList['project'] = util_load_url(url, useDict=True)['response']['result']['project']
+    rawList['project'] = util_load_url(url, useDict=True, useCache=True)['response']['result']['project']
 
     url = urlBase + '/contributors.xml?api_key=' + cfg['openhub']['api-key'] + '&sort=latest_commit&page='
     pageId = -1
-    while True:
+    isDone = False
+    for entry in journal:
+      pageId = entry['page']
+      rawList['people'].update(entry['people'])
+      newDate = datetime.datetime.strptime(entry['newest'], "%Y-%m-%d %H:%M:%S")
+      isDone = entry['done']
+
+    while not isDone:
       pageId += 1
       idList = util_load_url(url + str(pageId), useDict=True)['response']['result']['contributor_fact']
+      isDone = True
+      if len(idList) != 0:
+        xDate = datetime.datetime.strptime(idList[-1]['last_commit_time'], "%Y-%m-%dT%H:%M:%SZ")
+        if xDate >= searchDate:
+          isDone = False
+          if xDate > newDate:
+            newDate = xDate
+      common.util_journal_append(journalName, {'page': pageId,
+                                               'people': {row['contributor_id']: row for row in idList},
+                                               'newest': newDate.strftime("%Y-%m-%d %H:%M:%S"),
+                                               'done': isDone})
       for row in idList:
         rawList['people'][row['contributor_id']] = row
-      if len(idList) == 0:
-        break
-      xDate = datetime.datetime.strptime(idList[-1]['last_commit_time'], "%Y-%m-%dT%H:%M:%SZ")
-      if xDate < searchDate:
-        break
-      if xDate > newDate:
-        newDate = xDate
     rawList['newest-entry'] = newDate.strftime("%Y-%m-%d %H")
 
     util_dump_file(fileName, rawList)
+    common.util_journal_remove(journalName)
     return rawList
 
 
 
+def do_bugzilla_details(rows, urlH, urlC):
+    # one request per batch, the first id goes in the path, the rest in ids=
+    ids = [str(row['id']) for row in rows]
+    query = ''
+    if len(ids) > 1:
+      query = '?ids=' + ','.join(ids[1:])
+    historyList = {}
+    for bug in util_load_url(urlH.format(ids[0]) + query)['bugs']:
+      historyList[str(bug['id'])] = bug['history']
+    commentList = util_load_url(urlC.format(ids[0]) + query)['bugs']
+
+    for row in rows:
+      id = str(row['id'])
+      if not 'cc' in row:
+        row['cc'] = []
+      if not 'keywords' in row:
+        row['keywords'] = []
+      row['history'] = historyList[id]
+      row['comments'] = commentList[id]['comments']
+    return rows
+
+
+
 def get_bugzilla(cfg):
     fileName = cfg['homedir'] + 'dump/bugzilla_dump.json'
     searchDate, rawList = util_load_data_file(cfg, fileName, 'bugzilla', {'bugs': {}})
+    journalName, searchDate, journal = util_open_journal(fileName, searchDate, 'bugzilla')
     print("Updating bugzilla dump from " + rawList['newest-entry'])
 
+    # url can be pointed to a local stand-in server, workers caps the parallel history/comment requests
+    # and batch is the number of bugs asked for in each of them
+    bzUrl = cfg['bugzilla'].get('url', 'https://bugs.documentfoundation.org')
+    bzWorkers = cfg['bugzilla'].get('workers', 8)
+    bzBatch = cfg['bugzilla'].get('batch', 50)
+
+    # the journal holds the search result pages and the ids already stored in a segment
+    newList = []
+    doneList = set()
+    for entry in journal:
+      if 'page' in entry:
+        newList.extend(entry['page'])
+      else:
+        doneList.update(entry['done'])
+        xDate = datetime.datetime.strptime(entry['newest'], "%Y-%m-%d %H:%M:%S")
+        if xDate > searchDate:
+          searchDate = xDate
+
     searchData = searchDate - datetime.timedelta(days=2)
-    url = 'https://bugs.documentfoundation.org/rest/bug?' \
+    url = bzUrl + '/rest/bug?' \
           'f2=delta_ts&o2=greaterthaneq&query_format=advanced&v2=' + searchDate.strftime("%Y-%m-%d") + \
           '&limit=200&offset='
-    newList = []
     while True:
       tmp = util_load_url(url + str(len(newList)))['bugs']
       if len(tmp) == 0:
         break
+      common.util_journal_append(journalName, {'page': tmp})
       newList.extend(tmp)
-
-    urlH = 'https://bugs.documentfoundation.org/rest/bug/{}/history'
-    urlC = 'https://bugs.documentfoundation.org/rest/bug/{}/comment'
-    cnt = 0
-
-    for row in newList:
-      id = str(row['id'])
-      if not 'cc' in row:
-        row['cc'] = []
-      if not 'keywords' in row:
-        row['keywords'] = []
-      tmp = util_load_url(urlH.format(id))
-      row['history'] = tmp['bugs'][0]['history']
-      tmp = util_load_url(urlC.format(id))
-      row['comments'] = tmp['bugs'][id]['comments']
-      rawList['bugs'][id] = row
-      xDate = datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ")
-      if xDate > searchDate:
-        searchDate = xDate
-      cnt += 1
-      if cnt > 400:
-        rawList['newest-entry'] = searchDate.strftime('%Y-%m-%d %H')
-        util_dump_file(fileName, rawList)
-        cnt = 0
+    newList = [row for row in newList if not str(row['id']) in doneList]
+    common.util_profile_count('changed', len(newList))
+
+    urlH = bzUrl + '/rest/bug/{}/history'
+    urlC = bzUrl + '/rest/bug/{}/comment'
+    idList = []
+
+    batchList = [newList[i:i + bzBatch] for i in range(0, len(newList), bzBatch)]
+
+    # results are delivered in request order, so the checkpoint below only
+    # covers bugs that are completely stored
+    with ThreadPoolExecutor(max_workers=bzWorkers) as executor:
+      for rows in executor.map(lambda x: do_bugzilla_details(x, urlH, urlC), batchList):
+        for row in rows:
+          rawList['bugs'][str(row['id'])] = row
+          idList.append(str(row['id']))
+          xDate = datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ")
+          if xDate > searchDate:
+            searchDate = xDate
+          # checkpoints only append the changed bugs, the full dump is
+          # rewritten when there are too many segments
+          if len(idList) > 400:
+            rawList['newest-entry'] = searchDate.strftime('%Y-%m-%d %H')
+            common.util_dump_segment(fileName, rawList, 'bugs', idList)
+            common.util_journal_append(journalName, {'done': idList,
+                                                     'newest': searchDate.strftime("%Y-%m-%d %H:%M:%S")})
+            idList = []
 
     rawList['newest-entry'] = searchDate.strftime('%Y-%m-%d %H')
-    util_dump_file(fileName, rawList)
+    if common.util_dump_segment(fileName, rawList, 'bugs', idList) > cfg['bugzilla'].get('segments', 20) \
+        or not os.path.isfile(fileName):
+      util_dump_file(fileName, rawList)
+      common.util_remove_segments(fileName)
+    common.util_journal_remove(journalName)
     return rawList
 
 
 
 def do_ESC_QA_STATS_UPDATE():
-    tmp= util_load_url('https://bugs.documentfoundation.org/page.cgi?id=weekly-bug-summary.html', useRaw=True)
+    tmp= util_load_url('https://bugs.documentfoundation.org/page.cgi?id=weekly-bug-summary.html', useRaw=True, useCache=True)
 
     rawList = {}
 
@@ -300,9 +388,9 @@ def do_ESC_MAB_UPDATE(bz):
         rawList[id] = {'open': 0, 'total': 0}
 
       urlCall = url + key + '.*'
-      tmpTotal = util_load_url(urlCall, useRaw=True)
+      tmpTotal = util_load_url(urlCall, useRaw=True, useCache=True)
       rawList[id]['total'] += len(tmpTotal.split('\n')) -1
-      tmpOpen = util_load_url(urlCall + "&resolution=---", useRaw=True)
+      tmpOpen = util_load_url(urlCall + "&resolution=---", useRaw=True, useCache=True)
       rawList[id]['open'] += len(tmpOpen.split('\n')) - 1
 
     return rawList
@@ -311,7 +399,7 @@ def do_ESC_MAB_UPDATE(bz):
 
 def do_ESC_counting(bz, urlAdd):
     rawList = []
-    tmp = util_load_url(bz + urlAdd, useRaw=True).split('\n')[1:]
+    tmp = util_load_url(bz + urlAdd, useRaw=True, useCache=True).split('\n')[1:]
     cnt = len(tmp)
     for line in tmp:
       rawList.append(line.split(',')[0])
@@ -339,20 +427,19 @@ def get_esc_bugzilla(cfg):
          '&ctype=csv' \
          '&human=1'
 
-    rawList['ESC_QA_STATS_UPDATE'] = do_ESC_QA_STATS_UPDATE()
-    rawList['ESC_MAB_UPDATE'] = do_ESC_MAB_UPDATE(bz)
+    # every query is a (path in rawList, count key, list key, url) entry, they are all
+    # run at the end by a small pool, since bugzilla needs seconds for each csv export
+    queries = []
 
     urlBi = '&keywords=bisected%2C'
     url = '&order=tag DESC%2Cchangeddate DESC%2Cversion DESC%2Cpriority%2Cbug_severity'
-    rawList['ESC_BISECTED_UPDATE']['total'], \
-    rawList['ESC_BISECTED_UPDATE']['total_list'] = do_ESC_counting(bz, urlBi+url)
+    queries.append((('ESC_BISECTED_UPDATE',), 'total', 'total_list', urlBi+url))
     url = '&bug_status=UNCONFIRMED' \
           '&bug_status=NEW' \
           '&bug_status=ASSIGNED' \
           '&bug_status=REOPENED' \
           '&resolution=---'
-    rawList['ESC_BISECTED_UPDATE']['open'], \
-    rawList['ESC_BISECTED_UPDATE']['open_list'] = do_ESC_counting(bz, urlBi + url)
+    queries.append((('ESC_BISECTED_UPDATE',), 'open', 'open_list', urlBi + url))
 
     url = '&f2=status_whiteboard' \
           '&f3=OP' \
@@ -379,8 +466,7 @@ def get_esc_bugzilla(cfg):
           '&v2=bibisected35older' \
           '&v4=bibisected' \
           '&v5=bibisected'
-    rawList['ESC_BIBISECTED_UPDATE']['total'], \
-    rawList['ESC_BIBISECTED_UPDATE']['total_list'] = do_ESC_counting(bz, url)
+    queries.append((('ESC_BIBISECTED_UPDATE',), 'total', 'total_list', url))
     url = '&f2=status_whiteboard' \
           '&f3=OP' \
           '&f4=keywords' \
@@ -398,30 +484,25 @@ def get_esc_bugzilla(cfg):
           '&v2=bibisected35older' \
           '&v4=bibisected' \
           '&v5=bibisected'
-    rawList['ESC_BIBISECTED_UPDATE']['open'], \
-    rawList['ESC_BIBISECTED_UPDATE']['open_list'] = do_ESC_counting(bz, url)
+    queries.append((('ESC_BIBISECTED_UPDATE',), 'open', 'open_list', url))
 
     url = 'columnlist=bug_severity%2Cpriority%2Ccomponent%2Cop_sys%2Cassigned_to%2Cbug_status%2Cresolution%2Cshort_desc' \
           '&keywords=regression%2C%20' \
           '&order=bug_id'
-    rawList['ESC_REGRESSION_UPDATE']['total'], \
-    rawList['ESC_REGRESSION_UPDATE']['total_list']  = do_ESC_counting(bz, url)
+    queries.append((('ESC_REGRESSION_UPDATE',), 'total', 'total_list', url))
     url = '&keywords=regression%2C%20' \
           '&columnlist=bug_severity%2Cpriority%2Ccomponent%2Cop_sys%2Cassigned_to%2Cbug_status%2Cresolution%2Cshort_desc' \
           '&resolution=---' \
           '&query_based_on=Regressions' \
           '&known_name=Regressions'
-    rawList['ESC_REGRESSION_UPDATE']['open'], \
-    rawList['ESC_REGRESSION_UPDATE']['open_list'] = do_ESC_counting(bz, url)
+    queries.append((('ESC_REGRESSION_UPDATE',), 'open', 'open_list', url))
     url = url + '&bug_severity=blocker' \
                 '&bug_severity=critical' \
                 '&bug_status=NEW' \
                 '&bug_status=ASSIGNED' \
                 '&bug_status=REOPENED'
-    rawList['ESC_REGRESSION_UPDATE']['high'], \
-    rawList['ESC_REGRESSION_UPDATE']['high_list'] = do_ESC_counting(bz, url)
+    queries.append((('ESC_REGRESSION_UPDATE',), 'high', 'high_list', url))
 
-    rawList['ESC_COMPONENT_UPDATE']['all']['Crashes'] = {}
     url = '&keywords=regression' \
           '&short_desc=crash' \
           '&query_based_on=CrashRegressions' \
@@ -432,9 +513,7 @@ def get_esc_bugzilla(cfg):
           '&bug_status=NEEDINFO' \
           '&short_desc_type=allwordssubstr' \
           '&known_name=CrashRegressions'
-    rawList['ESC_COMPONENT_UPDATE']['all']['Crashes']['count'], \
-    rawList['ESC_COMPONENT_UPDATE']['all']['Crashes']['list'] = do_ESC_counting(bz, url)
-    rawList['ESC_COMPONENT_UPDATE']['all']['Borders'] = {}
+    queries.append((('ESC_COMPONENT_UPDATE', 'all', 'Crashes'), 'count', 'list', url))
     url = '&keywords=regression' \
           '&short_desc=border' \
           '&query_based_on=BorderRegressions' \
@@ -445,27 +524,21 @@ def get_esc_bugzilla(cfg):
           '&bug_status=NEEDINFO' \
           '&short_desc_type=allwordssubstr' \
           '&known_name=BorderRegressions'
-    rawList['ESC_COMPONENT_UPDATE']['all']['Borders']['count'], \
-    rawList['ESC_COMPONENT_UPDATE']['all']['Borders']['list'] = do_ESC_counting(bz, url)
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: docx filter'] = {}
+    queries.append((('ESC_COMPONENT_UPDATE', 'all', 'Borders'), 'count', 'list', url))
     url = '&bug_status=NEW' \
           '&bug_status=ASSIGNED' \
           '&bug_status=REOPENED' \
           '&bug_status=PLEASETEST' \
           '&component=Writer' \
           '&keywords=regression%2C filter%3Adocx%2C '
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: docx filter']['count'], \
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: docx filter']['list'] = do_ESC_counting(bz, url)
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: doc filter'] = {}
+    queries.append((('ESC_COMPONENT_UPDATE', 'all', 'Writer: docx filter'), 'count', 'list', url))
     url = '&bug_status=NEW' \
           '&bug_status=ASSIGNED' \
           '&bug_status=REOPENED' \
           '&bug_status=PLEASETEST' \
           '&component=Writer' \
           '&keywords=regression%2C filter%3Adoc%2C '
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: doc filter']['count'], \
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: doc filter']['list'] = do_ESC_counting(bz, url)
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: other filter'] = {}
+    queries.append((('ESC_COMPONENT_UPDATE', 'all', 'Writer: doc filter'), 'count', 'list', url))
     url = '&bug_status=NEW' \
           '&bug_status=ASSIGNED' \
           '&bug_status=REOPENED' \
@@ -478,18 +551,14 @@ def get_esc_bugzilla(cfg):
           '&o2=substring' \
           '&v1=filter%3Adocx%2C filter%3Adoc' \
           '&v2=filter%3A'
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: other filter']['count'], \
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: other filter']['list'] = do_ESC_counting(bz, url)
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: perf'] = {}
+    queries.append((('ESC_COMPONENT_UPDATE', 'all', 'Writer: other filter'), 'count', 'list', url))
     url = '&bug_status=NEW' \
           '&bug_status=ASSIGNED' \
           '&bug_status=REOPENED' \
           '&bug_status=PLEASETEST' \
           '&component=Writer' \
           '&keywords=regression%2C perf%2C '
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: perf']['count'], \
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: perf']['list'] = do_ESC_counting(bz, url)
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: other'] = {}
+    queries.append((('ESC_COMPONENT_UPDATE', 'all', 'Writer: perf'), 'count', 'list', url))
     url = '&bug_status=NEW' \
           '&bug_status=ASSIGNED' \
           '&bug_status=REOPENED' \
@@ -499,16 +568,13 @@ def get_esc_bugzilla(cfg):
           '&keywords=regression%2C' \
           '&o1=nowordssubstr' \
           '&v1=filter%3A%2C perf'
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: other']['count'], \
-    rawList['ESC_COMPONENT_UPDATE']['all']['Writer: other']['list'] = do_ESC_counting(bz, url)
-    rawList['ESC_COMPONENT_UPDATE']['all']['RTL'] = {}
+    queries.append((('ESC_COMPONENT_UPDATE', 'all', 'Writer: other'), 'count', 'list', url))
     url = '&bug_status=NEW' \
           '&bug_status=ASSIGNED' \
           '&bug_status=REOPENED' \
           '&bug_status=PLEASETEST' \
           '&keywords=regression%2C filter%3Artf%2C '
-    rawList['ESC_COMPONENT_UPDATE']['all']['RTL']['count'], \
-    rawList['ESC_COMPONENT_UPDATE']['all']['RTL']['list'] = do_ESC_counting(bz, url)
+    queries.append((('ESC_COMPONENT_UPDATE', 'all', 'RTL'), 'count', 'list', url))
 
     for comp in ['Calc', 'Impress', 'Base', 'Draw', 'LibreOffice', 'Writer', 'BASIC', 'Chart', 'Extensions',
                  'Formula Editor', 'Impress Remote', 'Installation', 'Linguistic', 'Printing and PDF export',
@@ -520,16 +586,12 @@ def get_esc_bugzilla(cfg):
             '&bug_status=REOPENED' \
             '&bug_status=PLEASETEST' \
             '&component=' + compUrl
-      rawList['ESC_COMPONENT_UPDATE']['all'][comp] = {}
-      rawList['ESC_COMPONENT_UPDATE']['all'][comp]['count'], \
-      rawList['ESC_COMPONENT_UPDATE']['all'][comp]['list'] = do_ESC_counting(bz, url)
+      queries.append((('ESC_COMPONENT_UPDATE', 'all', comp), 'count', 'list', url))
       url = url + '&bug_severity=blocker' \
                   '&bug_severity=critical'
-      rawList['ESC_COMPONENT_UPDATE']['high'][comp] = {}
-      rawList['ESC_COMPONENT_UPDATE']['high'][comp]['count'], \
-      rawList['ESC_COMPONENT_UPDATE']['high'][comp]['list'] = do_ESC_counting(bz, url)
+      queries.append((('ESC_COMPONENT_UPDATE', 'high', comp), 'count', 'list', url))
 
-    for os in ['Linux (All)', 'Windows (All)', 'Mac OS X (All)', 'All']:
+    for opSys in ['Linux (All)', 'Windows (All)', 'Mac OS X (All)', 'All']:
         url = '&keywords=regression' \
               '&bug_status=NEW' \
               '&bug_status=ASSIGNED' \
@@ -537,10 +599,8 @@ def get_esc_bugzilla(cfg):
               '&bug_status=PLEASETEST' \
               '&bug_severity=blocker' \
               '&bug_severity=critical' \
-              '&op_sys=' + os
-        rawList['ESC_COMPONENT_UPDATE']['os'][os] = {}
-        rawList['ESC_COMPONENT_UPDATE']['os'][os]['count'], \
-        rawList['ESC_COMPONENT_UPDATE']['os'][os]['list'] = do_ESC_counting(bz, url)
+              '&op_sys=' + opSys
+        queries.append((('ESC_COMPONENT_UPDATE', 'os', opSys), 'count', 'list', url))
 
     url = '&bug_status=UNCONFIRMED' \
           '&bug_status=NEW' \
@@ -552,9 +612,7 @@ def get_esc_bugzilla(cfg):
           '&chfieldvalue=high' \
           '&priority=high' \
           '&resolution=---'
-    rawList['HighSeverityBugs'] = {}
-    rawList['HighSeverityBugs']['count'], \
-    rawList['HighSeverityBugs']['list'] = do_ESC_counting(bz, url)
+    queries.append((('HighSeverityBugs',), 'count', 'list', url))
     url = '&bug_status=UNCONFIRMED' \
           '&bug_status=NEW' \
           '&bug_status=ASSIGNED' \
@@ -565,9 +623,7 @@ def get_esc_bugzilla(cfg):
           '&chfieldvalue=highest' \
           '&priority=highest' \
           '&resolution=---'
-    rawList['MostPressingBugs'] = {'open': {}, 'closed': {}}
-    rawList['MostPressingBugs']['open']['count'], \
-    rawList['MostPressingBugs']['open']['list'] = do_ESC_counting(bz, url)
+    queries.append((('MostPressingBugs', 'open'), 'count', 'list', url))
     url = '&bug_status=RESOLVED' \
           '&bug_status=VERIFIED' \
           '&bug_status=CLOSED' \
@@ -577,14 +633,84 @@ def get_esc_bugzilla(cfg):
           '&chfieldvalue=highest' \
           '&priority=highest' \
           '&resolution=---'
-    rawList['MostPressingBugs']['closed']['count'], \
-    rawList['MostPressingBugs']['closed']['list'] = do_ESC_counting(bz, url)
-
+    queries.append((('MostPressingBugs', 'closed'), 'count', 'list', url))
+
+    timing = {}
+    def timed(name, func, *args):
+      start = time.time()
+      result = func(*args)
+      timing[name] = round(time.time() - start, 2)
+      return result
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=cfg['bugzilla'].get('esc-workers', 4)) as executor:
+      qaStats = executor.submit(timed, 'ESC_QA_STATS_UPDATE', do_ESC_QA_STATS_UPDATE)
+      mab = executor.submit(timed, 'ESC_MAB_UPDATE', do_ESC_MAB_UPDATE, bz)
+      counts = [executor.submit(timed, '/'.join(path + (countKey,)), do_ESC_counting, bz, url)
+                for path, countKey, listKey, url in queries]
+
+      rawList['ESC_QA_STATS_UPDATE'] = qaStats.result()
+      rawList['ESC_MAB_UPDATE'] = mab.result()
+      for (path, countKey, listKey, url), count in zip(queries, counts):
+        entry = rawList
+        for key in path:
+          entry = entry.setdefault(key, {})
+        entry[countKey], entry[listKey] = count.result()
+    timing['total'] = round(time.time() - start, 2)
+
+    for name in sorted(timing, key=timing.get, reverse=True)[:6]:
+      print('  {:8.2f}s {}'.format(timing[name], name))
+    util_dump_file(cfg['homedir'] + 'dump/bugzilla_esc_timing.json', timing)
     util_dump_file(fileName, rawList)
     return rawList
 
 
 
+def util_load_gerrit(url):
+    # gerrit prefixes its JSON with )]}' (XSSI protection), skip that line and
+    # parse directly from the socket instead of building and slicing r.text
+    try:
+      r = common.util_http_request('GET', url, stream=True)
+      r.raise_for_status()
+      r.raw.decode_content = True
+      fp = io.TextIOWrapper(r.raw, encoding='utf-8')
+      fp.readline()
+      rawData = json.load(fp)
+      r.close()
+    except Exception as e:
+      raise Exception('Error load url ' + url + ' due to ' + str(e))
+    return rawData
+
+
+
+def do_gerrit_patch(row):
+    # fill in missing accounts/labels, so the analyze step does not need to check
+    for i in 'email', 'username', 'name':
+      if not i in row['owner']:
+        row['owner'][i] = '*dummy*'
+    for x in row['messages']:
+      if not 'author' in x:
+        x['author'] = {}
+      for i in 'email', 'username', 'name':
+        if not i in x['author']:
+          x['author'][i] = '*dummy*'
+    for i in 'Verified', 'Code-Review':
+      if not i in row['labels']:
+        row['labels'][i] = {}
+      if not 'all' in row['labels'][i]:
+        row['labels'][i]['all'] = []
+      for x in row['labels'][i]['all']:
+        if 'name' not in x:
+          x['name'] = '*dummy*'
+        if 'email' not in x:
+          x['email'] = '*dummy*'
+        if 'username' not in x:
+          x['username'] = '*dummy*'
+        if 'value' not in x:
+          x['value'] = 0
+
+
+
 def get_gerrit(cfg):
     fileName = cfg['homedir'] + 'dump/gerrit_dump.json'
     searchDate, rawList = util_load_data_file(cfg, fileName, 'gerrit', {'patch': {}, 'committers' : []})
@@ -605,6 +731,7 @@ def get_gerrit(cfg):
     if p.wait() != 0:
         raise CalledProcessError(p.returncode, cmd)
 
+    journalName, searchDate, journal = util_open_journal(fileName, searchDate, 'gerrit')
     queryType = 'q=after'
     if not os.path.isfile(fileName):
       # if gerrit_dump.json doesn't exist, the script will request the data from the last 365 days.
@@ -613,51 +740,57 @@ def get_gerrit(cfg):
 
     url = 'https://gerrit.libreoffice.org/changes/?' + queryType + ':' + searchDate.strftime("%Y-%m-%d") + \
         '&o=DETAILED_LABELS&o=DETAILED_ACCOUNTS&o=MESSAGES&o=CURRENT_COMMIT&o=CURRENT_REVISION&limit=200&start='
-    offset = 0
-    if 'offset' in rawList:
-      offset = int(rawList['offset'])
-    while True:
-      tmp = util_load_url(url + str(offset), useSkipJSON=True)
-      for row in tmp:
-        for i in 'email', 'username', 'name':
-          if not i in row['owner']:
-            row['owner'][i] = '*dummy*'
-        for x in row['messages']:
-          if not 'author' in x:
-            x['author'] = {}
-          for i in 'email', 'username', 'name':
-            if not i in x['author']:
-              x['author'][i] = '*dummy*'
-        for i in 'Verified', 'Code-Review':
-          if not i in row['labels']:
-            row['labels'][i] = {}
-          if not 'all' in row['labels'][i]:
-            row['labels'][i]['all'] = []
-          for x in row['labels'][i]['all']:
-            if 'name' not in x:
-              x['name'] = '*dummy*'
-            if 'email' not in x:
-              x['email'] = '*dummy*'
-            if 'username' not in x:
-              x['username'] = '*dummy*'
-            if 'value' not in x:
-              x['value'] = 0
-
-        rawList['patch'][str(row['_number'])] = row
-        xDate = datetime.datetime.strptime(row['updated'], "%Y-%m-%d %H:%M:%S.%f000")
-        if xDate > searchDate:
-          searchDate = xDate
-      if '_more_changes' in tmp[-1] and tmp[-1]['_more_changes'] == True:
-        rawList['offset'] = offset
-        offset += len(tmp)
-        del rawList['patch'][str(row['_number'])]['_more_changes']
-      else:
-        break
+
+    # the journal holds every page already received, replaces the old 'offset' key
     if 'offset' in rawList:
       del rawList['offset']
+    offset = 0
+    isDone = False
+    pageList = {}
+    for entry in journal:
+      if 'url' in entry:
+        url = entry['url']
+        continue
+      pageList.update(entry['patch'])
+      offset = entry['next']
+      isDone = entry['done']
+    if not journal:
+      common.util_journal_append(journalName, {'url': url})
+
+    # the next page is requested as soon as the current one has arrived, so
+    # normalising a page overlaps with the download of the next one
+    with ThreadPoolExecutor(max_workers=1) as executor:
+      nextPage = None
+      if not isDone:
+        nextPage = executor.submit(util_load_gerrit, url + str(offset))
+      while nextPage is not None:
+        tmp = nextPage.result()
+        isDone = True
+        if len(tmp) and '_more_changes' in tmp[-1]:
+          isDone = not tmp[-1]['_more_changes']
+          del tmp[-1]['_more_changes']
+        offset += len(tmp)
+        nextPage = None
+        if not isDone:
+          nextPage = executor.submit(util_load_gerrit, url + str(offset))
+
+        patchList = {}
+        for row in tmp:
+          do_gerrit_patch(row)
+          patchList[str(row['_number'])] = row
+        common.util_journal_append(journalName, {'patch': patchList, 'next': offset, 'done': isDone})
+        pageList.update(patchList)
+
+    common.util_profile_count('changed', len(pageList))
+    for key, row in pageList.items():
+      rawList['patch'][key] = row
+      xDate = datetime.datetime.strptime(row['updated'], "%Y-%m-%d %H:%M:%S.%f000")
+      if xDate > searchDate:
+        searchDate = xDate
 
     rawList['newest-entry'] = searchDate.strftime('%Y-%m-%d %H')
     util_dump_file(fileName, rawList)
+    common.util_journal_remove(journalName)
     return rawList
 
 
@@ -668,34 +801,50 @@ def get_git(cfg):
     print("Updating git dump from " + rawList['newest-entry'])
     searchDate - datetime.timedelta(days=1)
 
+    # repos holds the newest hash seen per repo, only commits after it are asked for.
+    # newest-entry is kept as running max, "%Y-%m-%d %H:%M:%S" strings compare like dates
+    if not 'repos' in rawList:
+      rawList['repos'] = {}
+    newestDate = datetime.datetime.strptime(rawList['newest-entry'], "%Y-%m-%d %H").strftime("%Y-%m-%d %H:%M:%S")
+
+    # NUL separated fields and records (-z), no quoting needed
+    useFormat = '%H%x00%ci%x00%an%x00%ae%x00%cn%x00%ce'
+    useFields = ['hash', 'date', 'author', 'author-email', 'committer', 'committer-email']
     for repo in cfg['git']['repos']:
       print(' working on ' + repo['name'])
-      useFormat = '{"hash": "%H", "date": "%ci", "author": "%an", "author-email": "%ae", ' \
-                  '"committer": "%cn", "committer-email": "%ce" }'
       basedir = cfg['homedir'] + '../libreoffice/'
+      gitCmd = ["git", "-C", basedir + repo['dir']]
       if repo['git'] and cfg['platform'] == 'linux':
-        check_call(["git", "-C", basedir + repo['dir'], "pull", "--quiet", "--all", "--rebase"], stderr=DEVNULL)
-      p = Popen([ "git", "-C", basedir + repo['dir'], "log", "--pretty=format:" + useFormat ], stdout=PIPE)
-      for x in io.TextIOWrapper(p.stdout, encoding="utf-8"):
-        # Json fails if there's a backslash somewhere in the git log
-        row = json.loads(x.replace("\\", "/"))
+        check_call(gitCmd + ["pull", "--quiet", "--all", "--rebase"], stderr=DEVNULL)
+
+      lastHash = rawList['repos'].get(repo['name'])
+      if lastHash and call(gitCmd + ["cat-file", "-e", lastHash + "^{commit}"], stderr=DEVNULL) == 0:
+        useRange = lastHash + '..HEAD'
+      else:
+        # first run or history was rewritten, fall back to the date
+        useRange = '--since=' + searchDate.strftime("%Y-%m-%d %H:%M:%S")
+      p = Popen(gitCmd + ["log", "-z", "--pretty=format:" + useFormat, useRange], stdout=PIPE)
+      fieldList = p.stdout.read().decode('utf-8', errors='replace').split('\0')
+      if p.wait() != 0:
+        raise CalledProcessError(p.returncode, p.args)
+
+      cnt = 0
+      for i in range(0, len(fieldList) - len(useFields) + 1, len(useFields)):
+        row = dict(zip(useFields, fieldList[i:i + len(useFields)]))
         row['repo'] = repo['name']
+        row['date'] = row['date'][:-6]
         key = repo['name'] + '_' + row['hash']
         if not key in rawList['commits']:
-          row['date'] = row['date'][:-6]
           rawList['commits'][key] = row
-        x = row['date'].split(' ')[:2]
-        xDate = datetime.datetime.strptime(x[0]+' '+x[1], "%Y-%m-%d %H:%M:%S")
-        if xDate < searchDate:
-          break
-
-    nDate = searchDate
-    for key in rawList['commits']:
-      xDate = datetime.datetime.strptime(rawList['commits'][key]['date'], "%Y-%m-%d %H:%M:%S")
-      if xDate > nDate:
-        nDate = xDate
-
-    rawList['newest-entry'] = nDate.strftime('%Y-%m-%d %H')
+          cnt += 1
+        if row['date'] > newestDate:
+          newestDate = row['date']
+        if i == 0:
+          rawList['repos'][repo['name']] = row['hash']
+      print('  ' + str(cnt) + ' new commits')
+      common.util_profile_count('changed', cnt)
+
+    rawList['newest-entry'] = newestDate[:13]
     util_dump_file(fileName, rawList)
     return rawList
 
@@ -721,7 +870,7 @@ def get_crash(cfg):
         rawList['crashtest'][type] = len(tmp) - 1
 
     print("Updating crashreport dump")
-    rawList['crashreport'] = util_load_url('https://crashreport.libreoffice.org/api/get/crash-count')
+    rawList['crashreport'] = util_load_url('https://crashreport.libreoffice.org/api/get/crash-count', useCache=True)
 
     rawList['newest-entry'] = datetime.datetime.now().strftime('%Y-%m-%d %H')
     util_dump_file(fileName, rawList)
@@ -740,44 +889,60 @@ def runCfg(platform):
         exit(-1)
     cfg['homedir'] = homeDir + '/'
     cfg['platform'] = platform
+    common.util_http_setup(cfg)
     print("Reading and writing data to " + cfg['homedir'])
     return cfg
 
 
 
-def runBuild(cfg):
-    try:
-      gerritData = get_gerrit(cfg)
-    except Exception as e:
-      common.util_errorMail(cfg, 'esc-collect', 'ERROR: get_gerrit failed with ' + str(e))
-      pass
-    try:
-      crashData = get_crash(cfg)
-    except Exception as e:
-      common.util_errorMail(cfg, 'esc-collect', 'ERROR: get_crash failed with ' + str(e))
-      pass
-    try:
-      openhubData = get_openhub(cfg)
-    except Exception as e:
-      common.util_errorMail(cfg, 'esc-collect', 'ERROR: get_openhub failed with ' + str(e))
-      pass
-    try:
-      bugzillaData = get_bugzilla(cfg)
-    except Exception as e:
-      common.util_errorMail(cfg, 'esc-collect', 'ERROR: get_bugzilla failed with ' + str(e))
-      pass
-    try:
-      ESCData = get_esc_bugzilla(cfg)
-    except Exception as e:
-      common.util_errorMail(cfg, 'esc-collect', 'ERROR: get_esc_bugzilla failed with ' + str(e))
-      pass
-    try:
-      gitData = get_git(cfg)
-    except Exception as e:
-      common.util_errorMail(cfg, 'esc-collect', 'ERROR: get_git failed with ' + str(e))
-      pass
+# sources are independent (own service, own dump file), each runs in its own thread.
+# Sources sharing a service share a semaphore, so e.g. bugzilla is never hit twice at once,
+# limits can be raised with cfg['collect']['limits'] = {'bugzilla': 2, ...}
+collectSources = [('gerrit',       get_gerrit,       'gerrit'),
+                  ('crash',        get_crash,        'crash'),
+                  ('openhub',      get_openhub,      'openhub'),
+                  ('bugzilla',     get_bugzilla,     'bugzilla'),
+                  ('esc_bugzilla', get_esc_bugzilla, 'bugzilla'),
+                  ('git',          get_git,          'git')]
+
 
 
+def runSource(cfg, name, func, lock, timing):
+    with lock:
+      start = time.time()
+      status = 'ok'
+      try:
+        common.util_profile_call('get_' + name, func, cfg, count=common.util_profile_sizes)
+      except Exception as e:
+        status = 'failed'
+        common.util_errorMail(cfg, 'esc-collect', 'ERROR: get_' + name + ' failed with ' + str(e))
+      timing[name] = {'status': status, 'seconds': round(time.time() - start, 1)}
+
+
+
+def runBuild(cfg):
+    limits = cfg.get('collect', {}).get('limits', {})
+    locks = {}
+    for name, func, service in collectSources:
+      if not service in locks:
+        locks[service] = threading.BoundedSemaphore(limits.get(service, 1))
+
+    common.util_profile_start(cfg, 'esc-collect')
+    timing = {}
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=len(collectSources)) as executor:
+      for name, func, service in collectSources:
+        executor.submit(runSource, cfg, name, func, locks[service], timing)
+
+    print('collect timing:')
+    for name, func, service in collectSources:
+      print('  {:14} {:>8} {:8.1f}s'.format(name, timing[name]['status'], timing[name]['seconds']))
+    print('  {:14} {:>8} {:8.1f}s'.format('total', '', time.time() - start))
+    timing['total'] = {'seconds': round(time.time() - start, 1),
+                       'date': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+    util_dump_file(cfg['homedir'] + 'dump/collect_timing.json', timing)
+    common.util_profile_finish()
+
 
 if __name__ == '__main__':
     runBuild(runCfg(sys.platform))
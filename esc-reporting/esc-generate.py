@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+#
+# This file is part of the LibreOffice project.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+#
+
+
+
+### DESCRIPTION
+#
+# This program writes synthetic data in the formats esc-collect.py produces, so
+# esc-analyze.py, esc-report.py and the qa scripts can be run (and timed with
+# esc-benchmark.py) without the dumps from vm174:
+#     esc/dump/['bugzilla','gerrit','git','openhub','bugzilla_esc','crash']_dump.json
+#     esc/dump/automate.json, esc/automateTODO.json, esc/config.json, esc/configQA.json
+#     esc/gitdm-config/
+#
+# esc-generate.py --bugs 100000 --seed 2
+#
+# Comments and history entries per bug follow a geometric distribution with a
+# long tail (a few bugs get ten times the mean), their dates cluster after the
+# creation of the bug. Status, resolution, keywords, cc, ... of a bug are the
+# result of its history, duplicates point to older bugs and can form chains.
+# The same arguments always give the same data.
+#
+# Existing files with these names in esc/ are overwritten.
+#
+
+
+
+import os
+import shutil
+import argparse
+import datetime
+import json
+import random
+
+
+
+statusWeights = {'UNCONFIRMED': 12, 'NEW': 25, 'ASSIGNED': 4, 'REOPENED': 2, 'NEEDINFO': 5,
+                 'RESOLVED': 40, 'VERIFIED': 7, 'CLOSED': 5}
+resolutionWeights = {'FIXED': 45, 'DUPLICATE': 20, 'WORKSFORME': 10, 'NOTOURBUG': 5, 'WONTFIX': 7,
+                     'INVALID': 5, 'INSUFFICIENTDATA': 8}
+severityWeights = {'normal': 60, 'enhancement': 15, 'minor': 8, 'major': 10, 'critical': 4,
+                   'blocker': 1, 'trivial': 2}
+priorityWeights = {'medium': 75, 'high': 10, 'low': 8, 'highest': 3, 'lowest': 4}
+keywordList = ['easyHack', 'needsDevEval', 'needsUXEval', 'topicUI', 'topicCleanup', 'regression',
+               'bisected', 'bibisected', 'bibisectRequest', 'possibleRegression', 'haveBacktrace',
+               'needsDevAdvice', 'perf', 'patch', 'dataLoss', 'filter:docx', 'filter:xlsx',
+               'filter:pptx', 'accessibility', 'text:cjk']
+componentList = ['Writer', 'Calc', 'Impress', 'Draw', 'Base', 'Math', 'LibreOffice', 'UI', 'BASIC',
+                 'filters and storage', 'Printing and PDF export', 'Documentation', 'Localization',
+                 'iOS', 'Android Viewer', 'deletionrequest']
+productList = ['LibreOffice'] * 18 + ['LibreOffice Online', 'Impress Remote', 'QA Tools']
+systemList = ['All', 'Linux (All)', 'Windows (All)', 'Mac OS X (All)', 'Android', 'iOS']
+platformList = ['All', 'x86-64 (AMD64)', 'ARM', 'Other']
+versionList = ['Inherited From OOo', '4.4.7.2 release', '6.4.7.2 release', '7.3.7.2 release',
+               '7.5.9.2 release', '7.6.4.1 release', '24.2.0.0 alpha0+', '24.2.1.2 release',
+               '24.8.0.0 alpha0+', 'unspecified']
+defaultAssignee = 'libreoffice-bugs@lists.freedesktop.org'
+uxMail = 'libreoffice-ux-advise@lists.freedesktop.org'
+commitMail = 'libreoffice-commits@lists.freedesktop.org'
+qaMail = 'qa-admin@libreoffice.org'
+
+
+
+def util_bz_date(x):
+    return x.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+
+def util_gerrit_date(x):
+    return x.strftime('%Y-%m-%d %H:%M:%S.%f000')
+
+
+
+def util_weighted(weights):
+    return random.choices(list(weights), weights=list(weights.values()))[0]
+
+
+
+def util_count(mean):
+    # geometric with the given mean, one bug in a hundred gets ten times more
+    if mean <= 0:
+      return 0
+    if random.random() < 0.01:
+      mean *= 10
+    return int(random.expovariate(1.0 / (mean + 0.5)))
+
+
+
+def util_pick(pool):
+    # a few people do most of the work
+    return pool[int(len(pool) * random.random() ** 3)]
+
+
+
+def util_after(start, end):
+    # activity on a bug mostly happens soon after it is created
+    return start + (end - start) * random.random() ** 3
+
+
+
+def util_create_people(args):
+    global people
+
+    people = {'reporters': ['user%d@example.com' % i for i in range(max(args.bugs // 3, 100))],
+              'triagers': ['qa%d@example.org' % i for i in range(max(args.bugs // 1000, 30))],
+              'developers': ['dev%d@example.org' % i for i in range(max(args.bugs // 200, 60))],
+              'names': {}}
+    # some developers also triage and report bugs
+    people['triagers'] += people['developers'][::3]
+    people['reporters'] += people['triagers']
+    # mail addresses that only differ in case, and gitdm aliases
+    people['developers'] += ['Dev%d@Example.org' % i for i in range(3)] + ['old%d@example.net' % i for i in range(3)]
+    for x in people['reporters'] + people['developers']:
+      i = x.split('@')[0]
+      people['names'][x] = random.choice(['', i.capitalize() + ' Surname', 'Surname, ' + i])
+
+
+
+def util_detail(mail):
+    return {'email': mail, 'name': mail, 'real_name': people['names'].get(mail, '')}
+
+
+
+def util_create_history(args, bugId, state, created, endDate, metaBugs):
+    # a status path ending in the final status of the bug, plus changes of other fields
+    final = util_weighted(statusWeights)
+    path = []
+    if final in ('NEW', 'ASSIGNED', 'REOPENED', 'RESOLVED', 'VERIFIED', 'CLOSED'):
+      path.append('NEW')
+    if final == 'NEEDINFO' or random.random() < 0.1:
+      path.append('NEEDINFO')
+      if final != 'NEEDINFO':
+        path.append('NEW')
+    if final == 'ASSIGNED':
+      path.append('ASSIGNED')
+    if final in ('REOPENED', 'RESOLVED', 'VERIFIED', 'CLOSED'):
+      path.append('RESOLVED')
+    if final == 'REOPENED':
+      path.append('REOPENED')
+    elif final in ('VERIFIED', 'CLOSED'):
+      path.append(final)
+
+    actions = ['status'] * len(path)
+    for i in range(max(util_count(args.history) - len(path), 0)):
+      actions.append(random.choice(['keywords', 'keywords', 'cc', 'cc', 'version', 'priority', 'severity',
+                                    'whiteboard', 'blocks', 'assigned_to', 'component', 'op_sys']))
+    # status changes keep the order of the path, other changes are in between
+    random.shuffle(actions)
+    times = sorted(util_after(created, endDate) for x in actions)
+    statusIndex = 0
+    history = []
+    for when, field in zip(times, actions):
+      who = util_pick(people['triagers'])
+      changes = []
+      if field == 'status':
+        new = path[statusIndex]
+        statusIndex += 1
+        changes.append({'field_name': 'status', 'added': new, 'removed': state['status']})
+        if state['status'] == 'UNCONFIRMED':
+          changes.append({'field_name': 'is_confirmed', 'added': '1', 'removed': '0'})
+          state['is_confirmed'] = True
+        if new == 'RESOLVED':
+          resolution = util_weighted(resolutionWeights) if final != 'REOPENED' else 'FIXED'
+          changes.append({'field_name': 'resolution', 'added': resolution, 'removed': ''})
+          state['resolution'] = resolution
+          if resolution == 'FIXED' and random.random() < 0.5:
+            who = state['assigned_to'] if state['assigned_to'] != defaultAssignee else util_pick(people['developers'])
+        elif new == 'REOPENED':
+          changes.append({'field_name': 'resolution', 'added': '', 'removed': state['resolution']})
+          state['resolution'] = ''
+        elif new == 'ASSIGNED' and state['assigned_to'] == defaultAssignee:
+          dev = util_pick(people['developers'])
+          changes.append({'field_name': 'assigned_to', 'added': dev, 'removed': defaultAssignee})
+          state['assigned_to'] = dev
+          who = dev
+        state['status'] = new
+      elif field == 'keywords':
+        if state['keywords'] and random.random() < 0.25:
+          x = random.choice(state['keywords'])
+          state['keywords'].remove(x)
+          changes.append({'field_name': 'keywords', 'added': '', 'removed': x})
+        else:
+          added = [x for x in random.sample(keywordList, random.randint(1, 2)) if x not in state['keywords']]
+          if not added:
+            continue
+          state['keywords'] += added
+          changes.append({'field_name': 'keywords', 'added': ', '.join(added), 'removed': ''})
+          if 'needsUXEval' in added and random.random() < 0.7:
+            state['cc'].append(uxMail)
+            changes.append({'field_name': 'cc', 'added': uxMail, 'removed': ''})
+      elif field == 'cc':
+        x = util_pick(people['reporters'])
+        if x in state['cc']:
+          continue
+        who = x
+        state['cc'].append(x)
+        changes.append({'field_name': 'cc', 'added': x, 'removed': ''})
+      elif field in ('version', 'priority', 'severity', 'component', 'op_sys'):
+        x = {'version': versionList, 'priority': list(priorityWeights), 'severity': list(severityWeights),
+             'component': componentList[:-1], 'op_sys': systemList}[field]
+        x = random.choice(x)
+        if x == state[field]:
+          continue
+        changes.append({'field_name': field, 'added': x, 'removed': state[field]})
+        state[field] = x
+      elif field == 'whiteboard':
+        x = random.choice(['target:24.2.0', 'backportRequest:24.2', 'QA:needsComment', 'ProposedEasyHack'])
+        if x in state['whiteboard']:
+          continue
+        changes.append({'field_name': 'whiteboard', 'added': x, 'removed': ''})
+        state['whiteboard'] = (state['whiteboard'] + ' ' + x).strip()
+      elif field == 'blocks':
+        if not metaBugs:
+          continue
+        x = random.choice(metaBugs)
+        if x in state['blocks']:
+          continue
+        state['blocks'].append(x)
+        changes.append({'field_name': 'blocks', 'added': str(x), 'removed': ''})
+      elif field == 'assigned_to':
+        x = util_pick(people['developers'])
+        changes.append({'field_name': 'assigned_to', 'added': x, 'removed': state['assigned_to']})
+        state['assigned_to'] = x
+      history.append({'who': who, 'when': util_bz_date(when), 'changes': changes})
+
+    history.sort(key=lambda x: x['when'])
+    return history
+
+
+
+def util_create_comments(args, bugId, state, creator, created, history, endDate):
+    comments = [{'id': bugId * 100, 'count': 0, 'creator': creator, 'creation_time': util_bz_date(created),
+                 'text': 'Description of bug %d' % bugId, 'tags': []}]
+    times = sorted(util_after(created, endDate) for x in range(util_count(args.comments)))
+    for i, when in enumerate(times):
+      x = random.random()
+      if x < 0.3:
+        who = creator
+      elif x < 0.8:
+        who = util_pick(people['triagers'])
+      else:
+        who = util_pick(people['reporters'])
+      text = random.choice(['Thank you for reporting the bug.', 'I can reproduce it in %s' % random.choice(versionList),
+                            'Still reproducible', 'Could you please attach a sample document?'])
+      if random.random() < 0.05:
+        who, text = qaMail, 'Dear Bug Submitter,\n\nThis bug has been in NEEDINFO status for more than 6 months.'
+      comments.append({'id': bugId * 100 + i + 1, 'count': i + 1, 'creator': who,
+                       'creation_time': util_bz_date(when), 'text': text, 'tags': []})
+    if state['resolution'] == 'FIXED':
+      when = max([created] + [datetime.datetime.fromisoformat(x['when'][:19]) for x in history])
+      comments.append({'id': bugId * 100 + 99, 'count': len(comments), 'creator': commitMail,
+                       'creation_time': util_bz_date(when), 'text': 'Dev committed a patch related to this issue.',
+                       'tags': []})
+    elif state['resolution'] == 'DUPLICATE' and state['dupe_of']:
+      comments.append({'id': bugId * 100 + 98, 'count': len(comments), 'creator': util_pick(people['triagers']),
+                       'creation_time': history[-1]['when'] if history else util_bz_date(created),
+                       'text': '*** This bug has been marked as a duplicate of bug %d ***' % state['dupe_of'],
+                       'tags': []})
+    comments.sort(key=lambda x: x['creation_time'])
+    # the other fields bugzilla returns for a comment
+    for i, x in enumerate(comments):
+      x.update({'count': i, 'bug_id': bugId, 'time': x['creation_time'], 'is_private': False, 'attachment_id': None})
+    return comments
+
+
+
+def util_create_bug(args, bugId, metaBugs):
+    startDate = cfg['nowDate'] - datetime.timedelta(days=365 * args.years)
+    # bug ids grow with time
+    created = startDate + (cfg['nowDate'] - startDate) * (bugId - 1 + random.random()) / args.bugs
+    creator = util_pick(people['reporters'])
+    isMeta = random.random() < 0.01
+    state = {'status': 'UNCONFIRMED', 'resolution': '', 'is_confirmed': False, 'keywords': [], 'cc': [],
+             'whiteboard': '', 'blocks': [], 'assigned_to': defaultAssignee, 'dupe_of': None,
+             'version': random.choice(versionList), 'priority': 'medium',
+             'severity': 'enhancement' if isMeta else util_weighted(severityWeights),
+             'component': random.choice(componentList), 'op_sys': random.choice(systemList)}
+    history = util_create_history(args, bugId, state, created, cfg['nowDate'], metaBugs)
+    if state['resolution'] == 'DUPLICATE' and bugId > 1:
+      # older bugs, half of them the close neighbours, so chains of duplicates show up
+      if random.random() < 0.5:
+        state['dupe_of'] = random.randint(max(bugId - 50, 1), bugId - 1)
+      else:
+        state['dupe_of'] = random.randint(1, bugId - 1)
+    comments = util_create_comments(args, bugId, state, creator, created, history, cfg['nowDate'])
+    lastChange = max([util_bz_date(created)] + [x['when'] for x in history] + [x['creation_time'] for x in comments])
+    if isMeta:
+      metaBugs.append(bugId)
+    crash = ''
+    seeAlso = []
+    if random.random() < 0.03:
+      crash = '["SwFrame::Paint(%d)"]' % random.randint(1, 500)
+      if random.random() < 0.5:
+        seeAlso.append('https://crashreport.libreoffice.org/stats/signature/' + crash[2:-2])
+    cc = [x for x in state['cc']]
+    return {'id': bugId,
+            'summary': ('[META] %s bugs and enhancements' % state['component']) if isMeta else
+                       random.choice(['FILESAVE DOCX: lost formatting', 'crash when opening file',
+                                      'UI: button misplaced', 'slow scrolling', 'wrong result']) + ' (%d)' % bugId,
+            'status': state['status'], 'resolution': state['resolution'], 'dupe_of': state['dupe_of'],
+            'keywords': sorted(state['keywords'], key=str.lower), 'whiteboard': state['whiteboard'],
+            'product': random.choice(productList), 'component': state['component'], 'version': state['version'],
+            'op_sys': state['op_sys'], 'platform': random.choice(platformList), 'severity': state['severity'],
+            'priority': state['priority'], 'is_confirmed': state['is_confirmed'],
+            'creator': creator, 'creator_detail': util_detail(creator),
+            'assigned_to': state['assigned_to'], 'assigned_to_detail': util_detail(state['assigned_to']),
+            'cc': cc, 'cc_detail': [util_detail(x) for x in cc],
+            'blocks': state['blocks'], 'depends_on': [], 'see_also': seeAlso, 'cf_crashreport': crash,
+            'alias': ['%s-META' % state['component'].split()[0]] if isMeta and random.random() < 0.5 else [],
+            'url': '', 'target_milestone': '---', 'flags': [],
+            'creation_time': util_bz_date(created), 'last_change_time': lastChange,
+            'comments': comments, 'history': history}
+
+
+
+def util_remove_segments(fileName):
+    # segments left by esc-collect would be merged over the generated dump
+    if os.path.isdir(fileName + '.segments'):
+      shutil.rmtree(fileName + '.segments')
+
+
+
+def util_dump_file(fileName, rawList):
+    util_remove_segments(fileName)
+    with open(fileName, 'w', encoding='utf-8') as fp:
+      json.dump(rawList, fp, ensure_ascii=False)
+
+
+
+def generate_bugzilla(args):
+    # written bug by bug, 500000 bugs do not fit comfortably in memory as one dict
+    fileName = cfg['homedir'] + 'dump/bugzilla_dump.json'
+    util_remove_segments(fileName)
+    metaBugs = []
+    with open(fileName, 'w', encoding='utf-8') as fp:
+      fp.write('{"bugs": {')
+      for bugId in range(1, args.bugs + 1):
+        if bugId > 1:
+          fp.write(', ')
+        fp.write('"%d": ' % bugId)
+        fp.write(json.dumps(util_create_bug(args, bugId, metaBugs), ensure_ascii=False))
+        if bugId % 50000 == 0:
+          print('  %d bugs' % bugId)
+      fp.write('}, "newest-entry": "%s"}' % cfg['nowDate'].strftime('%Y-%m-%d %H'))
+
+
+
+def generate_gerrit(args):
+    startDate = cfg['nowDate'] - datetime.timedelta(days=365)
+    committers = people['developers'][:max(len(people['developers']) // 4, 10)]
+    patches = {}
+    for i in range(1, args.patches + 1):
+      owner = util_pick(people['developers'])
+      updated = util_after(startDate, cfg['nowDate']) if random.random() < 0.3 else \
+                startDate + (cfg['nowDate'] - startDate) * random.random()
+      labels = {}
+      for label in 'Verified', 'Code-Review':
+        votes = []
+        for x in set(util_pick(committers) for x in range(random.randint(1, 3))):
+          votes.append({'name': people['names'][x] or x.split('@')[0], 'email': x, 'username': x.split('@')[0],
+                        'value': random.choice([-1, 0, 1, 1, 2]), 'date': util_gerrit_date(updated)})
+        if label == 'Verified':
+          votes.append({'name': 'Jenkins', 'email': 'ci@libreoffice.org', 'username': 'jenkins',
+                        'value': random.choice([-1, 1, 1]), 'date': util_gerrit_date(updated)})
+        labels[label] = {'all': votes}
+      messages = []
+      for x in range(util_count(4) + 1):
+        author = random.choice(['jenkins', owner.split('@')[0], util_pick(committers).split('@')[0]])
+        messages.append({'date': util_gerrit_date(updated), 'author': {'username': author},
+                         'message': random.choice(['Patch Set 1: Code-Review+1', 'Build Started', 'Looks good',
+                                                   'A polite ping, still working on this patch?']),
+                         '_revision_number': random.randint(1, 3)})
+      if random.random() < 0.02:
+        messages.append({'date': util_gerrit_date(updated), 'author': {'username': 'pootlebot'},
+                         'message': 'Abandoned\n\nThis change has been abandoned due to inactivity',
+                         '_revision_number': 1})
+      patches[str(i)] = {'_number': i, 'updated': util_gerrit_date(updated),
+                         'status': random.choices(['MERGED', 'NEW', 'ABANDONED', 'DRAFT'], weights=[70, 15, 14, 1])[0],
+                         'owner': {'name': people['names'][owner] or '*dummy*', 'email': owner,
+                                   'username': owner.split('@')[0]},
+                         'branch': random.choices(['master', 'libreoffice-24-2', 'distro/collabora/co-24.04',
+                                                   'feature/cib_contract'], weights=[85, 10, 4, 1])[0],
+                         'labels': labels, 'messages': messages,
+                         'subject': random.choice(['tdf#%d fix crash' % random.randint(1, args.bugs),
+                                                   'cleanup: use std::unique_ptr', 'related tdf#%d' % random.randint(1, args.bugs),
+                                                   'update translations']),
+                         'project': random.choices(['core', 'online', 'help', 'dictionaries'], weights=[80, 10, 8, 2])[0],
+                         'current_revision': 'r%d' % i,
+                         'revisions': {'r%d' % i: {'commit': {'parents': [{'commit': 'h%d' % random.randint(0, max(args.commits - 1, 0))}]}}}}
+    committers = [{'name': people['names'][x] or x.split('@')[0], 'email': x, 'username': x.split('@')[0]}
+                  for x in committers]
+    util_dump_file(cfg['homedir'] + 'dump/gerrit_dump.json',
+                   {'patch': patches, 'committers': committers, 'newest-entry': cfg['nowDate'].strftime('%Y-%m-%d %H')})
+
+
+
+def generate_git(args):
+    startDate = cfg['nowDate'] - datetime.timedelta(days=365)
+    committers = people['developers'][:max(len(people['developers']) // 4, 10)]
+    commits = {}
+    for i in range(args.commits):
+      author = util_pick(people['developers'])
+      committer = author if author in committers and random.random() < 0.8 else util_pick(committers)
+      repo = random.choices(['core', 'online', 'help', 'dictionaries'], weights=[80, 10, 8, 2])[0]
+      commits[repo + '_h%d' % i] = {'hash': 'h%d' % i, 'repo': repo,
+                                    'date': (startDate + (cfg['nowDate'] - startDate) * random.random()).strftime('%Y-%m-%d %H:%M:%S'),
+                                    'author': people['names'][author] or author.split('@')[0], 'author-email': author,
+                                    'committer': people['names'][committer] or committer.split('@')[0],
+                                    'committer-email': committer}
+    util_dump_file(cfg['homedir'] + 'dump/git_dump.json',
+                   {'commits': commits, 'newest-entry': cfg['nowDate'].strftime('%Y-%m-%d %H')})
+
+
+
+def generate_other(args):
+    ids = [str(x) for x in range(1, min(args.bugs, 20) + 1)]
+    newest = cfg['nowDate'].strftime('%Y-%m-%d %H')
+    util_dump_file(cfg['homedir'] + 'dump/openhub_dump.json', {'project': {}, 'people': {}, 'newest-entry': newest})
+    util_dump_file(cfg['homedir'] + 'dump/bugzilla_esc_dump.json',
+      {'ESC_QA_STATS_UPDATE': {'opened': 5, 'closed': 3, 'top15_closers': [{'who': 'qa0', 'closed': 2}],
+                               'top15_reporters': [{'who': 'user0', 'reported': 1}]},
+       'ESC_MAB_UPDATE': {'24.2': {'open': 3, 'total': 9}},
+       'ESC_BISECTED_UPDATE': {'open': 1, 'total': 2}, 'ESC_BIBISECTED_UPDATE': {'open': 1, 'total': 2},
+       'ESC_REGRESSION_UPDATE': {'open': 1, 'total': 2, 'high': 1},
+       'ESC_COMPONENT_UPDATE': {'all': {'Calc': {'count': 1, 'list': []}}, 'high': {'Calc': {'count': 1, 'list': []}},
+                                'os': {'All': {'count': 1, 'list': []}}},
+       'MostPressingBugs': {'open': {'count': 2, 'list': ids[:2]}, 'closed': {'count': 1, 'list': ids[2:3]}},
+       'HighSeverityBugs': {'count': 2, 'list': ids[3:5]}})
+    util_dump_file(cfg['homedir'] + 'dump/crash_dump.json',
+                   {'crashtest': {'crashlog': 1, 'exportCrash': 2}, 'crashreport': {'versions': {'24.2': 3}}})
+    util_dump_file(cfg['homedir'] + 'dump/automate.json', {'reminder': {}, 'award': {}})
+    util_dump_file(cfg['homedir'] + 'automateTODO.json',
+                   {'gerrit': {}, 'bugzilla': {}, 'mail': {'we_miss_you_email': {}, 'award_1st_email': {}}})
+    util_dump_file(cfg['homedir'] + 'config.json',
+                   {'bugzilla': {'close_except': []}, 'mail': {'bcc': ''},
+                    'automate': {'gerritReviewUserEmail': people['developers'][0],
+                                 'gerritReviewOnlineUserEmail': people['developers'][1]}})
+    util_dump_file(cfg['homedir'] + 'configQA.json',
+                   {'configQA': {'api-key': '', 'ignore': {'autoConfirmed': [], 'confirmer': [], 'inactiveAssigned': [],
+                                                           'newContributors': [], 'members': [], 'oldContributors': []}}})
+
+    gitdmDir = cfg['homedir'] + 'gitdm-config/'
+    with open(gitdmDir + 'aliases', 'w', encoding='utf-8') as fp:
+      for i in range(3):
+        print('old%d@example.net dev%d@example.org' % (i, i), file=fp)
+    with open(gitdmDir + 'domain-map', 'w', encoding='utf-8') as fp:
+      print('# domain map', file=fp)
+      print('example.com\tExample', file=fp)
+    with open(gitdmDir + 'licenseCompany.csv', 'w', encoding='utf-8') as fp:
+      print('example.org;Example;EXAMPLE', file=fp)
+    with open(gitdmDir + 'licensePersonal.csv', 'w', encoding='utf-8') as fp:
+      for x in people['developers'][::5]:
+        print('%s;%s;%s' % (x, people['names'][x] or x.split('@')[0], random.choice(['http://lists/x', 'PENDING yes', 'text'])), file=fp)
+
+
+
+def runGenerate(args):
+    random.seed(args.seed)
+    util_create_people(args)
+    for x in ('dump', 'archive', 'weeks', 'gitdm-config'):
+      os.makedirs(cfg['homedir'] + x, exist_ok=True)
+    print('Generating %d bugs, %d patches and %d commits in %s' % (args.bugs, args.patches, args.commits, cfg['homedir']))
+    generate_bugzilla(args)
+    generate_gerrit(args)
+    generate_git(args)
+    generate_other(args)
+
+
+
+def loadCfg(args):
+    global cfg
+
+    if 'esc_homedir' in os.environ:
+      homeDir = os.environ['esc_homedir']
+    else:
+      homeDir = '/home/esc-mentoring/esc'
+
+    cfg = {'homedir': homeDir + '/'}
+    if args.date:
+      cfg['nowDate'] = datetime.datetime.strptime(args.date, '%Y-%m-%d')
+    else:
+      cfg['nowDate'] = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    if args.patches is None:
+      args.patches = args.bugs // 2
+    if args.commits is None:
+      args.commits = args.bugs
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='write synthetic dumps to $esc_homedir')
+    parser.add_argument('--bugs', type=int, default=10000, help='number of bugs (default 10000)')
+    parser.add_argument('--patches', type=int, help='number of gerrit changes (default bugs/2)')
+    parser.add_argument('--commits', type=int, help='number of git commits (default bugs)')
+    parser.add_argument('--comments', type=float, default=6, help='mean number of comments after the description (default 6)')
+    parser.add_argument('--history', type=float, default=5, help='mean number of history entries (default 5)')
+    parser.add_argument('--years', type=float, default=3, help='bugs are created over that many years (default 3)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--date', help='date of the newest data, YYYY-MM-DD (default today)')
+    args = parser.parse_args()
+    loadCfg(args)
+    runGenerate(args)
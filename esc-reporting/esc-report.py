@@ -57,13 +57,16 @@ def util_load_data_file(fileName):
 
 
 def util_dump_file(fileName, rawList):
+    # write to a temporary file and rename it, so the old dump stays intact if we fail or get killed
     try:
-      fp = open(fileName, 'w', encoding='utf-8')
+      fp = open(fileName + '.tmp', 'w', encoding='utf-8')
       json.dump(rawList, fp, ensure_ascii=False, indent=4, sort_keys=True)
       fp.close()
+      os.replace(fileName + '.tmp', fileName)
     except Exception as e:
       print('Error dump file ' + fileName + ' due to ' + str(e))
-      os.remove(fileName)
+      if os.path.isfile(fileName + '.tmp'):
+        os.remove(fileName + '.tmp')
       exit(-1)
 
 
@@ -790,53 +793,57 @@ def runCfg(platform):
 def runReport():
     global cfg, statList
 
-    statList = util_load_data_file(cfg['homedir'] + 'stats.json')
+    common.util_profile_start(cfg, 'esc-report')
+    statList = common.util_profile_call('load_stats', common.util_load_snapshot, cfg['homedir'] + 'stats.json',
+                                        count=common.util_profile_sizes)
+    if statList is None:
+      exit(-1)
 
     xMail = []
     try:
-      x = report_bug_metrics()
+      x = common.util_profile_call('report_bug_metrics', report_bug_metrics)
       if not x is None:
         xMail.append(x)
     except Exception as e:
       common.util_errorMail(cfg, 'esc-report', 'ERROR: report_bug_metrics failed with ' + str(e))
       pass
     try:
-      x = report_day_mentoring()
+      x = common.util_profile_call('report_day_mentoring', report_day_mentoring)
       if not x is None:
         xMail.append(x)
     except Exception as e:
       common.util_errorMail(cfg, 'esc-report', 'ERROR: report_day_mentoring failed with ' + str(e))
       pass
     try:
-      x = report_mentoring()
+      x = common.util_profile_call('report_mentoring', report_mentoring)
       if not x is None:
         xMail.append(x)
     except Exception as e:
       common.util_errorMail(cfg, 'esc-report', 'ERROR: report_mentoring failed with ' + str(e))
       pass
     try:
-      x = report_ui()
+      x = common.util_profile_call('report_ui', report_ui)
       if not x is None:
         xMail.append(x)
     except Exception as e:
       common.util_errorMail(cfg, 'esc-report', 'ERROR: report_ui failed with ' + str(e))
       pass
     try:
-      x = report_qa()
+      x = common.util_profile_call('report_qa', report_qa)
       if not x is None:
         xMail.append(x)
     except Exception as e:
       common.util_errorMail(cfg, 'esc-report', 'ERROR: report_qa failed with ' + str(e))
       pass
     try:
-      x = report_myfunc()
+      x = common.util_profile_call('report_myfunc', report_myfunc)
       if not x is None:
         xMail.append(x)
     except Exception as e:
       common.util_errorMail(cfg, 'esc-report', 'ERROR: report_myfunc failed with ' + str(e))
       pass
     try:
-      x = report_esc_prototype()
+      x = common.util_profile_call('report_esc_prototype', report_esc_prototype)
       if not x is None:
         xMail.append(x)
     except Exception as e:
@@ -853,6 +860,7 @@ def runReport():
       error = common.sendMail(cfg, i['mail'], i['title'], text, i['attach'])
       if error:
         common.util_errorMail(cfg, 'esc-report', 'ERROR: mailing failed with ' + str(e))
+    common.util_profile_finish()
 
 
 if __name__ == '__main__':
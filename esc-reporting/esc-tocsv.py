@@ -22,6 +22,7 @@ import operator
 import datetime
 import json
 import xmltodict
+import common
 
 
 def util_load_data_file(fileName):
@@ -37,13 +38,16 @@ def util_load_data_file(fileName):
 
 
 def util_dump_file(fileName, rawList):
+    # write to a temporary file and rename it, so the old dump stays intact if we fail or get killed
     try:
-      fp = open(fileName, 'w', encoding='utf-8')
+      fp = open(fileName + '.tmp', 'w', encoding='utf-8')
       json.dump(rawList, fp, ensure_ascii=False, indent=4, sort_keys=True)
       fp.close()
+      os.replace(fileName + '.tmp', fileName)
     except Exception as e:
       print('Error dump file ' + fileName + ' due to ' + str(e))
-      os.remove(fileName)
+      if os.path.isfile(fileName + '.tmp'):
+        os.remove(fileName + '.tmp')
       exit(-1)
 
 
@@ -80,11 +84,22 @@ def doPrint(title, var, fp, useTop=53):
 def loadWeekGenerateCSV(argv):
     global cfg, statList
 
-    stats = []
-    for i in argv[1:]:
-        stats.append(util_load_data_file(cfg['homedir'] + 'weeks/' + i))
-
-    stats2016 = util_load_data_file(cfg['homedir'] + 'weeks/week_2017_01.json')
+    # only the counters used below are read from stats.sqlite,
+    # weeks that are not there yet are added from weeks/ first
+    storeFile = cfg['homedir'] + 'stats.sqlite'
+    weekNames = [os.path.splitext(i)[0] for i in argv[1:]]
+    pathList = ['commits/committer/1week/owner', 'commits/contributor/1week/owner', 'gerrit/committer/1week',
+                'gerrit/contributor/1week', 'easyhacks', 'trend/committer/owner/1year', 'trend/contributor/owner/1year']
+    stats = common.util_stats_query(storeFile, weekNames + ['week_2017_01'], pathList)
+    for i in weekNames + ['week_2017_01']:
+        if not i in stats:
+            common.util_stats_store(storeFile, i, util_load_data_file(cfg['homedir'] + 'weeks/' + i + '.json')['data'])
+            stats.update(common.util_stats_query(storeFile, [i], pathList))
+
+    trend2016 = {}
+    for xType in 'committer', 'contributor':
+        prefix = 'trend/' + xType + '/owner/1year/'
+        trend2016[xType] = {x[len(prefix):]: value for x, value in stats['week_2017_01'].items() if x.startswith(prefix)}
     statList = util_load_data_file(cfg['homedir'] + 'stats.json')
     gitData = util_load_data_file(cfg['homedir'] + 'dump/git_dump.json')
 
@@ -162,33 +177,34 @@ def loadWeekGenerateCSV(argv):
 
     trendLgd = len(csv['trend']['header'])
     for i in range(1,trendLgd):
-        for ent in stats2016['data']['trend']['committer']['owner']['1year']:
+        for ent in trend2016['committer']:
             x = int(ent)
             if x > csv['trend']['count'][i-1] and x <= csv['trend']['count'][i]:
-                csv['trend']['committer'][i] += stats2016['data']['trend']['committer']['owner']['1year'][ent]
-        for ent in stats2016['data']['trend']['contributor']['owner']['1year']:
+                csv['trend']['committer'][i] += trend2016['committer'][ent]
+        for ent in trend2016['contributor']:
             x = int(ent)
             if x > csv['trend']['count'][i-1] and x <= csv['trend']['count'][i]:
-                csv['trend']['contributor'][i] += stats2016['data']['trend']['contributor']['owner']['1year'][ent]
+                csv['trend']['contributor'][i] += trend2016['contributor'][ent]
 
     i = 1
     type1 = True
-    for week in stats:
-        csv['git']['committer']['week'][i] = week['data']['commits']['committer']['1week']['owner']
+    for name in weekNames:
+        week = stats[name]
+        csv['git']['committer']['week'][i] = week['commits/committer/1week/owner']
         csv['git']['committer']['sum'][i] = csv['git']['committer']['week'][i]
-        csv['git']['contributor']['week'][i] = week['data']['commits']['contributor']['1week']['owner']
+        csv['git']['contributor']['week'][i] = week['commits/contributor/1week/owner']
         csv['git']['contributor']['sum'][i] = csv['git']['contributor']['week'][i]
 
-        csv['gerrit']['committer']['merged']['week'][i] = week['data']['gerrit']['committer']['1week']['MERGED']
+        csv['gerrit']['committer']['merged']['week'][i] = week['gerrit/committer/1week/MERGED']
         csv['gerrit']['committer']['merged']['sum'][i]  = csv['gerrit']['committer']['merged']['week'][i]
-        csv['gerrit']['committer']['reviewed']['week'][i] = week['data']['gerrit']['committer']['1week']['reviewed']
+        csv['gerrit']['committer']['reviewed']['week'][i] = week['gerrit/committer/1week/reviewed']
         csv['gerrit']['committer']['reviewed']['sum'][i] = csv['gerrit']['committer']['reviewed']['week'][i]
 
-        csv['gerrit']['contributor']['merged']['week'][i] = week['data']['gerrit']['contributor']['1week']['MERGED']
+        csv['gerrit']['contributor']['merged']['week'][i] = week['gerrit/contributor/1week/MERGED']
         csv['gerrit']['contributor']['merged']['sum'][i] = csv['gerrit']['contributor']['merged']['week'][i]
 
-        csv['easyhacks']['assigned'][i] = week['data']['easyhacks']['assigned']
-        csv['easyhacks']['open'][i] = week['data']['easyhacks']['open']
+        csv['easyhacks']['assigned'][i] = week['easyhacks/assigned']
+        csv['easyhacks']['open'][i] = week['easyhacks/open']
         i += 1
 
     for i in range(1,53):
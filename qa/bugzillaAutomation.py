@@ -26,6 +26,9 @@ needsCommentPeriodDays = 14
 
 needsCommentTag = 'QA:needsComment'
 
+# number of bugs asked for or updated in a single REST call
+batchSize = 100
+
 def util_create_statList():
     return {
         'tags':
@@ -77,11 +80,11 @@ def analyze_bugzilla(statList, bugzillaData, cfg):
                 rowCreator = row['creator_detail']['email'].split('@')[0]
 
             if rowStatus == "NEEDINFO" and \
-                    datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ") < cfg['needInfoPingPeriod']:
+                    row['last_change_date'] < cfg['needInfoPingPeriod']:
                 statList['needInfoPing'][rowId] = rowCreator
 
             if common.isClosed(row['status']) and \
-                    datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ") < cfg['backportRequestPeriod']:
+                    row['last_change_date'] < cfg['backportRequestPeriod']:
                 for i in row['whiteboard'].split(' '):
                     if 'backport' in i.lower():
                         statList['backportRequest']['remove'][rowId] = i
@@ -122,7 +125,7 @@ def analyze_bugzilla(statList, bugzillaData, cfg):
                     statList['needsUXEval']['add'][rowId] = 'needsUXEval'
 
                 elif needsCommentTag not in row['whiteboard'] and \
-                        datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ") < cfg['needsCommentPeriod']:
+                        row['last_change_date'] < cfg['needsCommentPeriod']:
                     statList['needsComment']['add'][rowId] = needsCommentTag
 
             elif not bSameAuthor and needsCommentTag in row['whiteboard']:
@@ -141,7 +144,7 @@ def analyze_bugzilla(statList, bugzillaData, cfg):
                         else:
                             statList['tags']['removeObsolete'].add(comments[-1]["id"])
                     else:
-                        if datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ") < cfg['needInfoFollowUpPingPeriod']:
+                        if row['last_change_date'] < cfg['needInfoFollowUpPingPeriod']:
                             statList['needInfoFollowUpPing'][rowId] = rowCreator
 
                 elif 'MassPing-NeedInfo' in comments[-1]["text"] or \
@@ -159,7 +162,7 @@ def analyze_bugzilla(statList, bugzillaData, cfg):
                             else:
                                 statList['tags']['removeObsolete'].add(comments[-1]["id"])
 
-                    if datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ") < cfg['untouchedPeriod'] and \
+                    if row['last_change_date'] < cfg['untouchedPeriod'] and \
                             rowStatus == 'NEW' and 'needsUXEval' not in rowKeywords and 'easyHack' not in rowKeywords and \
                             row['component'] != 'Documentation' and (row['product'] == 'LibreOffice' or \
                             row['product'] == 'Impress Remote') and row['severity'] != 'enhancement':
@@ -170,17 +173,43 @@ def analyze_bugzilla(statList, bugzillaData, cfg):
                             if comments[-1]["id"] in statList['tags']['removeObsolete']:
                                 statList['tags']['removeObsolete'].remove(comments[-1]["id"])
 
-def post_comment(statList, keyInStatList, commentId, comment, addFirstLine, changeCommand=""):
-    for bugId, creator in statList[keyInStatList].items():
-        bugId = str(bugId)
+def util_batch(bugIds):
+    bugIds = [str(x) for x in bugIds]
+    for i in range(0, len(bugIds), batchSize):
+        yield bugIds[i:i + batchSize]
+
+def get_bugs_comments(bugIds):
+    rawList = {}
+    for subList in util_batch(bugIds):
+        # the first id goes in the path, the rest in ids=
+        urlGet = 'https://bugs.documentfoundation.org/rest/bug/' + subList[0] + '/comment?api_key=' + cfg['configQA']['api-key']
+        if len(subList) > 1:
+            urlGet += '&ids=' + ','.join(subList[1:])
+        rGet = requests.get(urlGet)
+        rawList.update(json.loads(rGet.text)['bugs'])
+        rGet.close()
+    return rawList
 
-        urlGet = 'https://bugs.documentfoundation.org/rest/bug/' + bugId + '/comment?api_key=' + cfg['configQA']['api-key']
+def get_bugs_field(bugIds, field):
+    rawList = {}
+    for subList in util_batch(bugIds):
+        urlGet = 'https://bugs.documentfoundation.org/rest/bug?id=' + ','.join(subList) + \
+                '&include_fields=id,' + field + '&api_key=' + cfg['configQA']['api-key']
         rGet = requests.get(urlGet)
-        rawData = json.loads(rGet.text)
+        for bug in json.loads(rGet.text)['bugs']:
+            rawList[str(bug['id'])] = bug[field]
         rGet.close()
+    return rawList
+
+def post_comment(statList, keyInStatList, commentId, comment, addFirstLine, changeCommand=""):
+    commentsList = get_bugs_comments(statList[keyInStatList].keys())
 
-        if commentId not in rawData['bugs'][bugId]['comments'][-1]['text'] or \
-                datetime.datetime.strptime(rawData['bugs'][bugId]['comments'][-1]['creation_time'], "%Y-%m-%dT%H:%M:%SZ") < cfg['untouchedPeriod']:
+    for bugId, creator in statList[keyInStatList].items():
+        bugId = str(bugId)
+
+        lastComment = commentsList[bugId]['comments'][-1]
+        if commentId not in lastComment['text'] or \
+                common.util_parse_bz_date(lastComment['creation_time']) < cfg['untouchedPeriod']:
             if addFirstLine:
                 firstLine = "Dear " + creator + ",\\n\\n"
                 fullComment = firstLine + comment
@@ -199,16 +228,27 @@ def post_comment(statList, keyInStatList, commentId, comment, addFirstLine, chan
                 print('Bug: ' + bugId + ' - ' + changeCommand)
                 rPut.close()
 
+def update_bugs(bugIds, command):
+    # Bugzilla applies the same change to every bug listed in ids
+    for subList in util_batch(bugIds):
+        urlPut = 'https://bugs.documentfoundation.org/rest/bug/' + subList[0] + '?api_key=' + cfg['configQA']['api-key']
+        rPut = requests.put(urlPut, ('{"ids" : [' + ','.join(subList) + '], ' + command[1:]).encode('utf-8'))
+        print('Bug: ' + ','.join(subList) + ' - ' + command)
+        rPut.close()
+
 def update_field(statList, field, whiteboardTag, add_cc = False):
+    bugIds = set()
+    for action, listOfBugs in statList[whiteboardTag].items():
+        bugIds.update(listOfBugs.keys())
+    fieldList = get_bugs_field(sorted(bugIds), field)
+
+    keywordsList = {}
+    ccList = []
     for action, listOfBugs in statList[whiteboardTag].items():
         for bugId, tag in listOfBugs.items():
             bugId = str(bugId)
 
-            urlGet = 'https://bugs.documentfoundation.org/rest/bug/' + bugId + '?api_key=' + cfg['configQA']['api-key']
-            rGet = requests.get(urlGet)
-            rawData = json.loads(rGet.text)
-            rGet.close()
-            fieldContent = rawData['bugs'][0][field]
+            fieldContent = fieldList[bugId]
 
             doRequest = False
             if action == 'add':
@@ -223,21 +263,24 @@ def update_field(statList, field, whiteboardTag, add_cc = False):
                         fieldContent = ' '.join(fieldContent.replace(tag, '').split())
 
             if doRequest:
+                # whiteboard content differs per bug, keyword changes are grouped per action and tag
                 if field == 'whiteboard':
                     command = '{"' + field + '" : "' + fieldContent + '"}'
+                    update_bugs([bugId], command)
                 elif field == 'keywords':
                     command = '{"' + field + '" : {"' + action + '" : ["' + tag + '"]}}'
-
-                urlPut = 'https://bugs.documentfoundation.org/rest/bug/' + bugId + '?api_key=' + cfg['configQA']['api-key']
-                rPut = requests.put(urlPut, command.encode('utf-8'))
-                print('Bug: ' + bugId + ' - ' + command)
-                rPut.close()
+                    if command not in keywordsList:
+                        keywordsList[command] = []
+                    keywordsList[command].append(bugId)
 
                 if add_cc:
-                    command = '{"cc": {"add": ["libreoffice-ux-advise@lists.freedesktop.org"]}}'
-                    rPut = requests.put(urlPut, command.encode('utf-8'))
-                    print('Bug: ' + bugId + ' - ' + command)
-                    rPut.close()
+                    ccList.append(bugId)
+
+    for command, listOfBugs in keywordsList.items():
+        update_bugs(listOfBugs, command)
+
+    if ccList:
+        update_bugs(ccList, '{"cc": {"add": ["libreoffice-ux-advise@lists.freedesktop.org"]}}')
 
 def automated_needsUXEval(statList):
     print('== add needsUXEval ==')
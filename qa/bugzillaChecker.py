@@ -73,7 +73,7 @@ def analyze_bugzilla_checkers(statList, bugzillaData, cfg):
 
         #Ignore META bugs and deletionrequest bugs.
         if not row['summary'].lower().startswith('[meta]') and row['component'].lower() != 'deletionrequest':
-            creationDate = datetime.datetime.strptime(row['creation_time'], "%Y-%m-%dT%H:%M:%SZ")
+            creationDate = row['creation_date']
 
             rowStatus = row['status']
             rowResolution = row['resolution']
@@ -133,7 +133,7 @@ def analyze_bugzilla_checkers(statList, bugzillaData, cfg):
 
             for action in row['history']:
                 actionMail = action['who']
-                actionDate = datetime.datetime.strptime(action['when'], "%Y-%m-%dT%H:%M:%SZ")
+                actionDate = action['when_date']
                 common.util_check_bugzilla_mail(statList, actionMail, '', actionDate, rowId)
 
                 # Use this variable in case the status is set before the resolution
@@ -281,21 +281,21 @@ def analyze_bugzilla_checkers(statList, bugzillaData, cfg):
             comments = row['comments'][1:]
             for idx, comment in enumerate(comments):
                 commentMail = comment['creator']
-                commentDate = datetime.datetime.strptime(comment['time'], "%Y-%m-%dT%H:%M:%SZ")
+                commentDate = comment['creation_date']
 
                 common.util_check_bugzilla_mail(statList, commentMail, '', commentDate, rowId)
 
             if len(comments) > 0:
                 if rowStatus == 'UNCONFIRMED' and 'needsDevAdvice' not in rowKeywords and row['severity'] != 'enhancement':
                     if comments[-1]['creator'] != creatorMail and '[Automated Action]' not in comments[-1]['text'] and \
-                        datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ") < cfg['retestUnconfirmedPeriod']:
+                        row['last_change_date'] < cfg['retestUnconfirmedPeriod']:
                         util_add_to_result(lResults, 'unconfirmed_last_comment_not_from_reporter', rowId)
                     elif comments[-1]['creator'] == creatorMail and \
-                        datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ") < cfg['inactiveUnconfirmedPeriod']:
+                        row['last_change_date'] < cfg['inactiveUnconfirmedPeriod']:
                         util_add_to_result(lResults, 'unconfirmed_last_comment_from_reporter', rowId)
 
             if rowStatus == 'UNCONFIRMED' and row['severity'] == 'enhancement' and 'QA:needsComment' not in row['whiteboard'] and \
-                    datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ") < cfg['retestUnconfirmedPeriod']:
+                    row['last_change_date'] < cfg['retestUnconfirmedPeriod']:
                 util_add_to_result(lResults, 'inactive_unconfirmed_enhacements', rowId)
 
             if autoFixed:
@@ -339,7 +339,7 @@ def analyze_bugzilla_checkers(statList, bugzillaData, cfg):
                     if len(comments) >= it:
                         commentMail = comments[negIt]['creator']
                         commentText = comments[negIt]['text']
-                        commentDate = datetime.datetime.strptime(comments[negIt]['time'], "%Y-%m-%dT%H:%M:%SZ")
+                        commentDate = comments[negIt]['creation_date']
                         if commentDate < cfg['PingFixedBugPeriod'] and commentDate >= cfg['pingFixedBugDiff']:
                             if it == 1 and  'Is this bug fixed?' in commentText and commentMail == 'xiscofauli@libreoffice.org':
                                 util_add_to_result(lResults, 'take_action_fixed_bug', rowId)
@@ -363,7 +363,7 @@ def analyze_bugzilla_checkers(statList, bugzillaData, cfg):
                         break
 
             if rowStatus == 'ASSIGNED' and \
-                    datetime.datetime.strptime(row['last_change_time'], "%Y-%m-%dT%H:%M:%SZ") < cfg['inactiveAssignedPeriod'] and \
+                    row['last_change_date'] < cfg['inactiveAssignedPeriod'] and \
                     rowId not in cfg['configQA']['ignore']['inactiveAssigned']:
                 util_add_to_result(lResults, 'inactive_assignee', rowId)
 
@@ -117,7 +117,7 @@ def analyze_bugzilla_data(statList, bugzillaData, cfg):
 
         #Ignore META bugs and deletionrequest bugs.
         if not row['summary'].lower().startswith('[meta]') and row['component'].lower() != 'deletionrequest':
-            creationDate = datetime.datetime.strptime(row['creation_time'], "%Y-%m-%dT%H:%M:%SZ")
+            creationDate = row['creation_date']
             if creationDate < statOldDate:
                 statOldDate = creationDate
             if creationDate > statNewDate:
@@ -165,7 +165,7 @@ def analyze_bugzilla_data(statList, bugzillaData, cfg):
 
             for action in row['history']:
                 actionMail = action['who']
-                actionDate = datetime.datetime.strptime(action['when'], "%Y-%m-%dT%H:%M:%SZ")
+                actionDate = action['when_date']
                 if not common.util_check_range_time(actionDate, args):
                     continue
                 common.util_check_bugzilla_mail(
@@ -263,7 +263,7 @@ def analyze_bugzilla_data(statList, bugzillaData, cfg):
             commitNoticiation=False
             for idx, comment in enumerate(comments):
                 commentMail = comment['creator']
-                commentDate = datetime.datetime.strptime(comment['time'], "%Y-%m-%dT%H:%M:%SZ")
+                commentDate = comment['creation_date']
 
                 common.util_check_bugzilla_mail(
                         statList, commentMail, '', commentDate, rowId)
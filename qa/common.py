@@ -10,6 +10,8 @@
 import os
 import datetime
 import json
+import gc
+import pickle
 import argparse
 from pyshorteners import Shortener
 
@@ -19,6 +21,9 @@ dataDir = '/home/xisco/dev-tools/esc-reporting/dump/'
 #Path where configQA.json and addObsolete.txt are
 configDir = '/home/xisco/dev-tools/qa/'
 
+#Load comments and history of the bugs as compact records, see util_compact_bugs()
+compactBugzilla = False
+
 priorities_list = ['highest','high','medium','low','lowest']
 
 severities_list = ['blocker', 'critical', 'major', 'normal', 'minor', 'trivial','enhancement']
@@ -81,6 +86,10 @@ def util_create_person_bugzilla(email, name):
         }
 
 def util_check_duplicated(bugzillaData, bugID, isFirst=True):
+    # dumps loaded by util_load_snapshot() have the answers in 'dupeRoots', see util_index_duplicates()
+    if isFirst and 'dupeRoots' in bugzillaData:
+        return bugzillaData['dupeRoots'].get(str(bugID))
+
     rowDupeOf = bugzillaData['bugs'][str(bugID)]['dupe_of']
     if rowDupeOf:
         if str(rowDupeOf) in bugzillaData['bugs']:
@@ -150,9 +159,347 @@ def util_check_range_time(xDate, cfg):
     else:
         return False
 
+def util_load_dump(fileName):
+    # esc-collect appends changed bugs to <fileName>.segments/*.jsonl between
+    # full rewrites of the dump, merge them to get the current view
+    segDir = fileName + '.segments/'
+    if not os.path.isdir(segDir):
+        return util_load_file(fileName)
+
+    rawData = {}
+    if os.path.isfile(fileName):
+        rawData = util_load_file(fileName)
+
+    for segment in sorted(x for x in os.listdir(segDir) if x.endswith('.jsonl')):
+        with open(segDir + segment, encoding='utf-8') as fp:
+            for line in fp:
+                for key, value in json.loads(line).items():
+                    if type(value) is dict and type(rawData.get(key)) is dict:
+                        rawData[key].update(value)
+                    else:
+                        rawData[key] = value
+    return rawData
+
+# Same snapshot format as esc-reporting/common.py, so a snapshot written by
+# esc-analyze is reused here and the other way around
+# Bugzilla dumps are stored with decoded timestamps, see util_decode_bugs() and
+# util_compact_bugs(), and the duplicates index of util_index_duplicates().
+snapshotVersion = 3
+
+def util_parse_bz_date(x):
+    # bugzilla always uses "%Y-%m-%dT%H:%M:%SZ", fromisoformat is a lot faster than strptime
+    return datetime.datetime.fromisoformat(x[:19])
+
+def util_decode_bug(row):
+    # adds a datetime next to every timestamp the scripts use:
+    # bug creation_date/last_change_date, comment creation_date, history when_date
+    if 'creation_time' in row:
+        row['creation_date'] = util_parse_bz_date(row['creation_time'])
+    if 'last_change_time' in row:
+        row['last_change_date'] = util_parse_bz_date(row['last_change_time'])
+    for comment in row.get('comments', []):
+        comment['creation_date'] = util_parse_bz_date(comment['creation_time'])
+    for change in row.get('history', []):
+        change['when_date'] = util_parse_bz_date(change['when'])
+
+def util_decode_bugs(rawData):
+    for row in rawData['bugs'].values():
+        util_decode_bug(row)
+
+def util_index_duplicates(rawData):
+    # maps every duplicate to what util_check_duplicated() returns for it, the end of
+    # its dupe_of chain inside the dump. Every chain is walked once, all the bugs on it
+    # get the same end. A cycle ends at the bug where it closes.
+    bugs = rawData['bugs']
+    roots = {}
+    for key, row in bugs.items():
+        if not row.get('dupe_of') or key in roots:
+            continue
+        path = []
+        seen = set()
+        x = key
+        while True:
+            if x in roots:
+                root = roots[x]
+                break
+            dupeOf = bugs[x].get('dupe_of')
+            if not dupeOf or x in seen:
+                root = bugs[x]['id']
+                break
+            path.append(x)
+            seen.add(x)
+            if str(dupeOf) not in bugs:
+                root = bugs[x]['id']
+                break
+            x = str(dupeOf)
+        for x in path:
+            roots[x] = root
+    rawData['dupeRoots'] = roots
+
+# util_load_snapshot(fileName, compact=True) keeps comments, history entries and
+# their changes as records (tuples) instead of dicts, and shares the strings that
+# repeat all over the dump (status, component, mail addresses, field names, ...).
+# A record is read like the dict it replaces: comment['creator'], change.get('added'),
+# fields not in its list (like 'bug_id' and 'time' of a comment) are dropped.
+class BugzillaRecord(tuple):
+    __slots__ = ()
+    fields = ()
+    index = {}
+
+    def __getitem__(self, key):
+        if type(key) is str:
+            try:
+                key = self.index[key]
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        i = self.index.get(key)
+        return default if i is None else tuple.__getitem__(self, i)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def keys(self):
+        return self.fields
+
+    def items(self):
+        return zip(self.fields, self)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+class BugzillaComment(BugzillaRecord):
+    __slots__ = ()
+    fields = ('id', 'count', 'creator', 'creation_time', 'creation_date', 'text', 'tags', 'is_private', 'attachment_id')
+    index = {x: i for i, x in enumerate(fields)}
+
+class BugzillaHistory(BugzillaRecord):
+    __slots__ = ()
+    fields = ('who', 'when', 'when_date', 'changes')
+    index = {x: i for i, x in enumerate(fields)}
+
+class BugzillaChange(BugzillaRecord):
+    __slots__ = ()
+    fields = ('field_name', 'added', 'removed', 'attachment_id')
+    index = {x: i for i, x in enumerate(fields)}
+
+# values of the bugs that are shared between them, details are the *_detail dicts
+compactBugFields = ['status', 'resolution', 'component', 'product', 'classification', 'op_sys', 'platform',
+        'version', 'priority', 'severity', 'target_milestone', 'whiteboard', 'creator', 'assigned_to', 'qa_contact']
+compactBugLists = ['keywords', 'cc']
+compactBugDetails = ['creator_detail', 'assigned_to_detail', 'qa_contact_detail']
+
+def util_compact_detail(shared, detail):
+    key = (detail.get('email'), detail.get('name'), detail.get('real_name'))
+    if key not in shared:
+        shared[key] = {x: shared.setdefault(y, y) if type(y) is str else y for x, y in detail.items()}
+    return shared[key]
+
+def util_compact_date(dates, x):
+    # returns the timestamp and its datetime, comments and changes of one action have the same
+    if x not in dates:
+        dates[x] = (x, util_parse_bz_date(x))
+    return dates[x]
+
+def util_compact_bugs(rawData):
+    # util_decode_bugs() with records, see BugzillaRecord
+    shared = {}
+    dates = {}
+    for row in rawData['bugs'].values():
+        row['creation_date'] = util_parse_bz_date(row['creation_time'])
+        row['last_change_date'] = util_parse_bz_date(row['last_change_time'])
+        for x in compactBugFields:
+            if type(row.get(x)) is str:
+                row[x] = shared.setdefault(row[x], row[x])
+        for x in compactBugLists:
+            if x in row:
+                row[x] = [shared.setdefault(y, y) for y in row[x]]
+        for x in compactBugDetails:
+            if type(row.get(x)) is dict:
+                row[x] = util_compact_detail(shared, row[x])
+        if 'cc_detail' in row:
+            row['cc_detail'] = [util_compact_detail(shared, x) for x in row['cc_detail']]
+
+        comments = []
+        for x in row.get('comments', []):
+            when = util_compact_date(dates, x['creation_time'])
+            comments.append(BugzillaComment((x.get('id'), x.get('count'), shared.setdefault(x['creator'], x['creator']),
+                when[0], when[1], x.get('text'), tuple(shared.setdefault(y, y) for y in x.get('tags', [])),
+                x.get('is_private'), x.get('attachment_id'))))
+        if 'comments' in row:
+            row['comments'] = comments
+
+        history = []
+        for x in row.get('history', []):
+            when = util_compact_date(dates, x['when'])
+            changes = tuple(BugzillaChange((shared.setdefault(y['field_name'], y['field_name']),
+                shared.setdefault(y['added'], y['added']), shared.setdefault(y['removed'], y['removed']),
+                y.get('attachment_id'))) for y in x['changes'])
+            history.append(BugzillaHistory((shared.setdefault(x['who'], x['who']), when[0], when[1], changes)))
+        if 'history' in row:
+            row['history'] = history
+
+def util_snapshot_key(fileName):
+    key = [snapshotVersion]
+    names = [fileName]
+    segDir = fileName + '.segments/'
+    if os.path.isdir(segDir):
+        names += sorted(segDir + x for x in os.listdir(segDir) if x.endswith('.jsonl'))
+    for x in names:
+        if os.path.isfile(x):
+            st = os.stat(x)
+            key.append([os.path.basename(x), st.st_mtime_ns, st.st_size])
+    return key
+
+def util_load_snapshot(fileName, compact=False):
+    key = util_snapshot_key(fileName)
+    # compact data has its own snapshot, the scripts may load the same dump either way
+    snapshotName = fileName + ('.compact.snapshot' if compact else '.snapshot')
+    # the data is a tree without cycles, the cyclic gc only slows down loading it
+    gcEnabled = gc.isenabled()
+    gc.disable()
+    try:
+        try:
+            with open(snapshotName, 'rb') as fp:
+                if pickle.load(fp) == key:
+                    return pickle.load(fp)
+        except Exception:
+            pass
+
+        rawData = util_load_dump(fileName)
+        if rawData is not None and type(rawData.get('bugs')) is dict:
+            if compact:
+                util_compact_bugs(rawData)
+            else:
+                util_decode_bugs(rawData)
+            util_index_duplicates(rawData)
+        if rawData is not None:
+            tmpName = snapshotName + '.' + str(os.getpid())
+            try:
+                with open(tmpName, 'wb') as fp:
+                    pickle.dump(key, fp, pickle.HIGHEST_PROTOCOL)
+                    pickle.dump(rawData, fp, pickle.HIGHEST_PROTOCOL)
+                os.replace(tmpName, snapshotName)
+            except Exception as e:
+                print('Error dump file ' + snapshotName + ' due to ' + str(e))
+                if os.path.isfile(tmpName):
+                    os.remove(tmpName)
+        return rawData
+    finally:
+        if gcEnabled:
+            gc.enable()
+
 def get_bugzilla():
     fileName = dataDir + 'bugzilla_dump.json'
-    return util_load_file(fileName)
+    return util_load_snapshot(fileName, compactBugzilla)
+
+# iter_bugzilla() reads the dump one bug at a time instead of loading all of it,
+# for scripts that look at every bug on its own. It yields (key, row) like
+# bugzillaData['bugs'].items(), with the timestamps decoded as in get_bugzilla().
+# fields limits the rows to these fields, 'creation_date' and 'last_change_date'
+# can be asked for like the others. Bugs changed in the segments of esc-collect
+# are read first, they are the only ones kept in memory.
+streamChunkSize = 1 << 20
+
+streamDateFields = {'creation_date': 'creation_time', 'last_change_date': 'last_change_time'}
+
+def util_stream_skip(fp, buf, pos):
+    # moves pos to the next character that is not whitespace, buf is '' at the end of fp
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n':
+            pos += 1
+        if pos < len(buf):
+            return buf, pos
+        buf = fp.read(streamChunkSize)
+        pos = 0
+        if not buf:
+            return buf, pos
+
+def util_stream_expect(fp, buf, pos, chars):
+    buf, pos = util_stream_skip(fp, buf, pos)
+    if not buf or buf[pos] not in chars:
+        raise ValueError('expected ' + ' or '.join(chars) + ' in ' + fp.name)
+    return buf[pos], buf, pos + 1
+
+def util_stream_value(fp, buf, pos, decoder):
+    # parses the json value at pos, reading more of fp until it is complete
+    buf, pos = util_stream_skip(fp, buf, pos)
+    while True:
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+            # a number could go on in the next chunk, everything else ends with a character of its own
+            if end < len(buf) or type(value) in (str, dict, list):
+                return value, buf, end
+        except json.JSONDecodeError:
+            pass
+        # read at least as much as we have, a big bug is not parsed over and over
+        more = fp.read(max(streamChunkSize, len(buf) - pos))
+        if not more:
+            value, end = decoder.raw_decode(buf, pos)
+            return value, buf, end
+        buf = buf[pos:] + more
+        pos = 0
+
+def util_stream_bugs(fileName):
+    # yields the members of the 'bugs' object of a dump, the other keys are skipped
+    decoder = json.JSONDecoder()
+    with open(fileName, encoding='utf-8') as fp:
+        char, buf, pos = util_stream_expect(fp, '', 0, '{')
+        while char != '}':
+            char, buf, pos = util_stream_expect(fp, buf, pos, '"}')
+            if char == '}':
+                break
+            key, buf, pos = util_stream_value(fp, buf, pos - 1, decoder)
+            char, buf, pos = util_stream_expect(fp, buf, pos, ':')
+            if key != 'bugs':
+                value, buf, pos = util_stream_value(fp, buf, pos, decoder)
+            else:
+                char, buf, pos = util_stream_expect(fp, buf, pos, '{')
+                while char != '}':
+                    char, buf, pos = util_stream_expect(fp, buf, pos, '"}')
+                    if char == '}':
+                        break
+                    bugKey, buf, pos = util_stream_value(fp, buf, pos - 1, decoder)
+                    char, buf, pos = util_stream_expect(fp, buf, pos, ':')
+                    row, buf, pos = util_stream_value(fp, buf, pos, decoder)
+                    yield bugKey, row
+                    # drop what has been parsed, the buffer stays around one chunk
+                    if pos > streamChunkSize:
+                        buf = buf[pos:]
+                        pos = 0
+                    char, buf, pos = util_stream_expect(fp, buf, pos, ',}')
+            char, buf, pos = util_stream_expect(fp, buf, pos, ',}')
+
+def util_project_bug(row, fields):
+    if fields is not None:
+        keep = set(fields) | set(streamDateFields[x] for x in fields if x in streamDateFields)
+        row = {x: y for x, y in row.items() if x in keep}
+    util_decode_bug(row)
+    return row
+
+def util_iter_bugs(fileName, fields=None):
+    # same view as util_load_dump(), the bugs of the segments replace those of the dump
+    segBugs = {}
+    segDir = fileName + '.segments/'
+    if os.path.isdir(segDir):
+        for segment in sorted(x for x in os.listdir(segDir) if x.endswith('.jsonl')):
+            with open(segDir + segment, encoding='utf-8') as fp:
+                for line in fp:
+                    segBugs.update(json.loads(line).get('bugs', {}))
+
+    if os.path.isfile(fileName):
+        for key, row in util_stream_bugs(fileName):
+            if key in segBugs:
+                row = segBugs.pop(key)
+            yield key, util_project_bug(row, fields)
+    for key, row in segBugs.items():
+        yield key, util_project_bug(row, fields)
+
+def iter_bugzilla(fields=None):
+    fileName = dataDir + 'bugzilla_dump.json'
+    return util_iter_bugs(fileName, fields)
 
 def get_config():
     fileName = configDir + 'configQA.json'
@@ -93,7 +93,7 @@ def analyze_bugzilla_data(statList, bugzillaData, cfg):
 
         #Ignore META bugs and deletionrequest bugs.
         if not row['summary'].lower().startswith('[meta]') and row['component'].lower() != 'deletionrequest':
-            creationDate = datetime.strptime(row['creation_time'], "%Y-%m-%dT%H:%M:%SZ")
+            creationDate = row['creation_date']
 
 
             #Some old bugs were directly created as NEW, skipping the UNCONFIRMED status
@@ -150,7 +150,7 @@ def analyze_bugzilla_data(statList, bugzillaData, cfg):
 
             for action in row['history']:
                 actionMail = action['who']
-                actionDate = datetime.strptime(action['when'], "%Y-%m-%dT%H:%M:%SZ")
+                actionDate = action['when_date']
 
                 common.util_check_bugzilla_mail(
                         statList, actionMail, '', actionDate, rowId)
@@ -385,7 +385,7 @@ def analyze_bugzilla_data(statList, bugzillaData, cfg):
             commitNoticiation = False
             for idx, comment in enumerate(comments):
                 commentMail = comment['creator']
-                commentDate = datetime.strptime(comment['time'], "%Y-%m-%dT%H:%M:%SZ")
+                commentDate = comment['creation_date']
 
                 common.util_check_bugzilla_mail(
                         statList, commentMail, '', commentDate, rowId)
@@ -14,10 +14,10 @@ def util_create_statList_crashes():
         'crashes': {}
         }
 
-def analyze_bugzilla_checkers(statList, bugzillaData):
+def analyze_bugzilla_checkers(statList, bugList):
     print("Analyzing crashes\n", end="", flush=True)
 
-    for key, row in bugzillaData['bugs'].items():
+    for key, row in bugList:
         rowId = row['id']
 
         #Ignore META bugs and deletionrequest bugs.
@@ -51,10 +51,10 @@ def create_crashes_list(statList) :
 if __name__ == '__main__':
     print("Reading and writing data to " + common.dataDir)
 
-    bugzillaData = common.get_bugzilla()
+    bugList = common.iter_bugzilla(['id', 'summary', 'component', 'status', 'resolution', 'cf_crashreport'])
 
     statList = util_create_statList_crashes()
 
-    analyze_bugzilla_checkers(statList, bugzillaData)
+    analyze_bugzilla_checkers(statList, bugList)
 
     create_crashes_list(statList)
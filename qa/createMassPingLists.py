@@ -17,10 +17,10 @@ def util_create_statList():
         '3years': []
     }
 
-def analyze_bugzilla(statList, bugzillaData):
+def analyze_bugzilla(statList, bugList):
     print("Analyze bugzilla\n", end="", flush=True)
 
-    for key, row in bugzillaData['bugs'].items():
+    for key, row in bugList:
         #Ignore META bugs and deletionrequest bugs.
         if not row['summary'].lower().startswith('[meta]') and row['component'].lower() != 'deletionrequest':
             rowId = row['id']
@@ -58,10 +58,10 @@ if __name__ == '__main__':
     print("Reading and writing data to " + common.dataDir)
 
 
-    bugzillaData = common.get_bugzilla()
+    bugList = common.iter_bugzilla(['id', 'summary', 'component', 'status', 'comments'])
 
     statList = util_create_statList()
 
-    analyze_bugzilla(statList, bugzillaData)
+    analyze_bugzilla(statList, bugList)
 
     massping_Report(statList)
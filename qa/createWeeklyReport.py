@@ -44,7 +44,7 @@ def analyze_bugzilla_weeklyReport(statList, bugzillaData, cfg):
 
         #Ignore META bugs and deletionrequest bugs.
         if not row['summary'].lower().startswith('[meta]') and row['component'].lower() != 'deletionrequest':
-            creationDate = datetime.datetime.strptime(row['creation_time'], "%Y-%m-%dT%H:%M:%SZ")
+            creationDate = row['creation_date']
             if creationDate < statOldDate:
                 statOldDate = creationDate
             if creationDate > statNewDate:
@@ -71,7 +71,7 @@ def analyze_bugzilla_weeklyReport(statList, bugzillaData, cfg):
 
             for action in row['history']:
                 actionMail = action['who']
-                actionDate = datetime.datetime.strptime(action['when'], "%Y-%m-%dT%H:%M:%SZ")
+                actionDate = action['when_date']
                 common.util_check_bugzilla_mail(statList, actionMail, '', actionDate, rowId)
 
                 # Use these variables in case the status is set before the resolution or viceversa
@@ -223,7 +223,7 @@ def analyze_bugzilla_weeklyReport(statList, bugzillaData, cfg):
             comments = row['comments'][1:]
             for idx, comment in enumerate(comments):
                 commentMail = comment['creator']
-                commentDate = datetime.datetime.strptime(comment['time'], "%Y-%m-%dT%H:%M:%SZ")
+                commentDate = comment['creation_date']
 
                 common.util_check_bugzilla_mail(statList, commentMail, '', commentDate, rowId)
 
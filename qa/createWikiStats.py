@@ -94,7 +94,7 @@ def analyze_bugzilla_wiki_stats(statList, bugzillaData, cfg):
 
         #Ignore META bugs and deletionrequest bugs.
         if not row['summary'].lower().startswith('[meta]') and row['component'].lower() != 'deletionrequest':
-            creationDate = datetime.datetime.strptime(row['creation_time'], "%Y-%m-%dT%H:%M:%SZ")
+            creationDate = row['creation_date']
             if creationDate < statOldDate:
                 statOldDate = creationDate
             if creationDate > statNewDate:
@@ -156,12 +156,11 @@ def analyze_bugzilla_wiki_stats(statList, bugzillaData, cfg):
                 bugzillaData['bugs'][str(rowDupeOf)]['op_sys'],
                 bugzillaData['bugs'][str(rowDupeOf)]['version'],
                 bugzillaData['bugs'][str(rowDupeOf)]['keywords'],
-                datetime.datetime.strptime(
-                    bugzillaData['bugs'][str(rowDupeOf)]['creation_time'], "%Y-%m-%dT%H:%M:%SZ"), 1)
+                bugzillaData['bugs'][str(rowDupeOf)]['creation_date'], 1)
 
             for action in row['history']:
                 actionMail = action['who']
-                actionDate = datetime.datetime.strptime(action['when'], "%Y-%m-%dT%H:%M:%SZ")
+                actionDate = action['when_date']
 
                 # Use this variable in case the status is set before the resolution
                 newStatus = None
@@ -223,7 +222,7 @@ def analyze_bugzilla_wiki_stats(statList, bugzillaData, cfg):
             comments = row['comments'][1:]
             for idx, comment in enumerate(comments):
                 commentMail = comment['creator']
-                commentDate = datetime.datetime.strptime(comment['time'], "%Y-%m-%dT%H:%M:%SZ")
+                commentDate = comment['creation_date']
 
                 util_increase_user_actions(statList, rowId, commentMail, bugTargets, 'comments', commentDate)
 